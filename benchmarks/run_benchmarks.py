@@ -0,0 +1,274 @@
+"""Throughput benchmarks for simulation, generation, the behavior engine and ETL loading.
+
+Runs headless and writes one JSON document per run so results can be diffed
+between versions:
+
+    python -m benchmarks.run_benchmarks --customers 1000 10000 --months 6 24
+    python -m benchmarks.run_benchmarks --compare old.json --output new.json
+"""
+import argparse
+import contextlib
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(project_root)
+
+import numpy as np
+import pandas as pd
+
+from config.business_rules import PLANS
+from core.day_offsets import SIMULATION_START, DAYS_PER_MONTH
+from core.result_sinks import CsvSink
+from main import SIMULATION_ENGINES, build_config, build_behavior_engine
+from generators.customer_generator import CustomerGenerator
+from generators.subscription_generator import SubscriptionGenerator, SubscriptionIndex
+
+SUITES = ('simulate', 'generators', 'behavior', 'etl')
+DEFAULT_CUSTOMERS = [1000, 10000, 100000]
+DEFAULT_MONTHS = [6, 24, 36]
+DEFAULT_SEED = 12345
+BEHAVIOR_CALLS = 20000
+LOOKUPS_PER_CUSTOMER = 10
+
+
+def _timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+@contextlib.contextmanager
+def _quiet():
+    """Swallow the simulators' progress prints so timings are not dominated by terminal output."""
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        yield
+
+
+def _record(suite, name, seconds, count, unit, **params):
+    return {
+        'suite': suite,
+        'name': name,
+        **params,
+        'seconds': round(seconds, 6),
+        'count': count,
+        'unit': unit,
+        'rate': round(count / seconds, 2) if seconds > 0 else None
+    }
+
+
+def _config(customers, months, seed):
+    config = build_config(seed=seed)
+    config['TOTAL_CUSTOMERS'] = customers
+    config['SIMULATION_MONTHS'] = months
+    return config
+
+
+def bench_simulate(customers, months, engines, seed):
+    results = []
+    config = _config(customers, months, seed)
+    customers_df = CustomerGenerator(config).generate(customers)
+    for engine in engines:
+        simulator = SIMULATION_ENGINES[engine](build_behavior_engine(seed), SubscriptionGenerator(config), config)
+        with _quiet():
+            _, seconds = _timed(simulator.simulate, customers_df.copy())
+        results.append(_record(
+            'simulate', f'{SIMULATION_ENGINES[engine].__name__}.simulate', seconds, customers * months,
+            'customer_months/s', engine=engine, customers=customers, months=months
+        ))
+    return results
+
+
+def bench_generators(customers, seed):
+    config = _config(customers, 24, seed)
+    customers_df, customer_seconds = _timed(CustomerGenerator(config).generate, customers)
+    _, subscription_seconds = _timed(SubscriptionGenerator(config).generate_initial_subscriptions, customers_df)
+    subscriptions_df, lifecycle_seconds = _timed(
+        SubscriptionGenerator(config).simulate_subscription_lifecycle, customers_df, build_behavior_engine(seed), 24
+    )
+
+    rng = np.random.default_rng(seed)
+    lookups = customers * LOOKUPS_PER_CUSTOMER
+    lookup_customers = rng.choice(customers_df['id'].to_numpy(), lookups)
+    lookup_days = rng.integers(0, 24 * DAYS_PER_MONTH, lookups)
+    index, index_seconds = _timed(SubscriptionIndex, subscriptions_df)
+    _, lookup_seconds = _timed(index.lookup, lookup_customers, lookup_days)
+    return [
+        _record('generators', 'CustomerGenerator.generate', customer_seconds, customers, 'rows/s', customers=customers),
+        _record('generators', 'SubscriptionGenerator.generate_initial_subscriptions', subscription_seconds,
+                customers, 'rows/s', customers=customers),
+        _record('generators', 'SubscriptionGenerator.simulate_subscription_lifecycle', lifecycle_seconds,
+                customers * 24, 'customer_months/s', customers=customers),
+        _record('generators', 'SubscriptionIndex', index_seconds, len(subscriptions_df), 'rows/s', customers=customers),
+        _record('generators', 'SubscriptionIndex.lookup', lookup_seconds, lookups, 'lookups/s', customers=customers)
+    ]
+
+
+def bench_behavior(seed, calls=BEHAVIOR_CALLS):
+    config = _config(1000, 24, seed)
+    behavior_engine = build_behavior_engine(seed)
+    customers = CustomerGenerator(config).generate(1000).to_dict('records')
+    usage = behavior_engine.calculate_usage(customers[0], 1, 'Basic')
+
+    def customer_month(i):
+        return customers[i % len(customers)], i % 24 + 1
+
+    methods = {
+        'get_monthly_behavior': lambda c, m: behavior_engine.get_monthly_behavior(c, m),
+        'calculate_usage': lambda c, m: behavior_engine.calculate_usage(c, m, 'Basic', usage),
+        'should_upgrade': lambda c, m: behavior_engine.should_upgrade(c, usage, 'Basic', m),
+        'should_downgrade': lambda c, m: behavior_engine.should_downgrade(c, usage, 'Pro', m),
+        'calculate_churn_risk': lambda c, m: behavior_engine.calculate_churn_risk(c, m, [usage], 0),
+        'evaluate_month': lambda c, m: behavior_engine.evaluate_month(c, m, m, 'Basic', usage, [usage], 0)
+    }
+
+    results = []
+    for name, method in methods.items():
+        start = time.perf_counter()
+        for i in range(calls):
+            method(*customer_month(i))
+        seconds = time.perf_counter() - start
+        results.append(_record('behavior', f'BehaviorEngine.{name}', seconds, calls, 'calls/s'))
+    return results
+
+
+def bench_etl(customers, months, seed):
+    """Load a vectorized run's CSV output into a throwaway SQLite database with the real loaders."""
+    from etl.db_connection import get_db_connection
+    from etl.load_dimensions import DimensionLoader
+    from etl.load_facts import FactLoader
+    from etl.parallel_load import ParallelFactLoader
+
+    config = _config(customers, months, seed)
+    customers_df = CustomerGenerator(config).generate(customers)
+    simulator = SIMULATION_ENGINES['vectorized'](build_behavior_engine(seed), SubscriptionGenerator(config), config)
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        sink = CsvSink(data_dir)
+        sink.write_tables({'plans': pd.DataFrame(PLANS)})
+        with _quiet():
+            simulator.simulate_to_sink(customers_df, sink)
+
+        results = []
+        dates = pd.date_range(SIMULATION_START, periods=(months + 2) * DAYS_PER_MONTH)
+        date_dimension = pd.DataFrame({'date': dates, 'date_id': range(1, len(dates) + 1)})
+        with _quiet():
+            db = get_db_connection(f"sqlite:///{os.path.join(data_dir, 'benchmark.db')}")
+            db.load_dataframe(date_dimension, 'dim_date')
+
+            dimensions = DimensionLoader(db=db, data_path=data_dir)
+            facts = FactLoader(db=db, data_path=data_dir)
+            steps = [
+                ('DimensionLoader.load_plans', dimensions.load_plans),
+                ('DimensionLoader.load_features', dimensions.load_features),
+                ('DimensionLoader.load_customers', dimensions.load_customers),
+                ('FactLoader.load_subscriptions', facts.load_subscriptions),
+                ('FactLoader.load_usage', facts.load_usage),
+                ('FactLoader.load_billing', facts.load_billing)
+            ]
+            for name, step in steps:
+                rows, seconds = _timed(step)
+                results.append(_record('etl', name, seconds, int(rows), 'rows/s',
+                                       customers=customers, months=months, database='sqlite'))
+            db.engine.dispose()
+
+            # All three fact tables again, partitioned and loaded concurrently into a second database
+            parallel_db = get_db_connection(f"sqlite:///{os.path.join(data_dir, 'benchmark_parallel.db')}")
+            parallel_db.load_dataframe(date_dimension, 'dim_date')
+            DimensionLoader(db=parallel_db, data_path=data_dir).load_features()
+            parallel = ParallelFactLoader(db=parallel_db, data_path=data_dir)
+            loaded, seconds = _timed(parallel.load_all_facts)
+            results.append(_record('etl', 'ParallelFactLoader.load_all_facts', seconds, sum(loaded.values()), 'rows/s',
+                                   customers=customers, months=months, database='sqlite', workers=parallel.workers))
+            parallel_db.engine.dispose()
+    return results
+
+
+def run(suites, customer_scales, month_scales, engines, seed, behavior_calls=BEHAVIOR_CALLS):
+    results = []
+    for suite in suites:
+        print(f"Running {suite} benchmarks...")
+        if suite == 'behavior':
+            results += bench_behavior(seed, behavior_calls)
+        elif suite == 'generators':
+            for customers in customer_scales:
+                results += bench_generators(customers, seed)
+        else:
+            for customers in customer_scales:
+                for months in month_scales:
+                    print(f"  {customers} customers x {months} months")
+                    if suite == 'simulate':
+                        results += bench_simulate(customers, months, engines, seed)
+                    else:
+                        results += bench_etl(customers, months, seed)
+    return results
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=project_root, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _result_key(result):
+    return tuple((k, result.get(k)) for k in ('suite', 'name', 'engine', 'customers', 'months'))
+
+
+def compare(baseline_path, results):
+    with open(baseline_path) as f:
+        baseline = {_result_key(r): r for r in json.load(f)['results']}
+    print(f"\nComparison against {baseline_path} (rate ratio, >1 is faster):")
+    for result in results:
+        old = baseline.get(_result_key(result))
+        if old and old['rate'] and result['rate']:
+            scale = ' '.join(f"{k}={result[k]}" for k in ('engine', 'customers', 'months') if k in result)
+            print(f"  {result['name']:<55} {scale:<40} {result['rate'] / old['rate']:.2f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark simulation, generation and ETL throughput')
+    parser.add_argument('--suites', nargs='+', choices=SUITES, default=list(SUITES))
+    parser.add_argument('--customers', nargs='+', type=int, default=DEFAULT_CUSTOMERS)
+    parser.add_argument('--months', nargs='+', type=int, default=DEFAULT_MONTHS)
+    parser.add_argument('--engines', nargs='+', choices=sorted(SIMULATION_ENGINES), default=['scalar', 'vectorized'])
+    parser.add_argument('--behavior-calls', type=int, default=BEHAVIOR_CALLS)
+    parser.add_argument('--seed', type=int, default=DEFAULT_SEED)
+    parser.add_argument('--output', default='benchmark_results.json')
+    parser.add_argument('--compare', default=None, help='Earlier results JSON to compare rates against')
+    args = parser.parse_args()
+
+    results = run(args.suites, args.customers, args.months, args.engines, args.seed, args.behavior_calls)
+    report = {
+        'created_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'git_commit': _git_commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'seed': args.seed,
+        'results': results
+    }
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+
+    for result in results:
+        scale = ' '.join(f"{k}={result[k]}" for k in ('engine', 'customers', 'months') if k in result)
+        # A step too fast for the timer to register has no rate
+        rate = f"{result['rate']:>14,.0f}" if result['rate'] is not None else f"{'n/a':>14}"
+        print(f"{result['name']:<55} {scale:<40} {rate} {result['unit']}")
+    print(f"\nResults written to {args.output}")
+
+    if args.compare:
+        compare(args.compare, results)
+
+
+if __name__ == "__main__":
+    main()
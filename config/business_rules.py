@@ -28,6 +28,18 @@ PLANS = [
    }
 ]
 
+# Bit positions of the features in usage_events.feature_used. They are part of the
+# stored data: give new features the next free bit and never renumber existing ones.
+FEATURE_BITS = {
+    'basic_analytics': 0,
+    'dashboard': 1,
+    'api_access': 2,
+    'advanced_analytics': 3,
+    'custom_reports': 4,
+    'white_label': 5,
+    'priority_support': 6
+}
+
 UPGRADE_USAGE_THRESHOLD = 0.8
 PAYMENT_FAILURE_CHURN_THRESHOLD = 2
 SIMULATION_MONTHS = 24
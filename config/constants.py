@@ -1,7 +1,7 @@
 GEOGRAPHIES  = ['US', 'EU']
 
 INDUSTRIES = [
-    'ecomerice',
+    'ecommerce',
     'saas_tech',
     'financial_services',
     'marketing_agency',
@@ -19,10 +19,19 @@ ACQUISITION_CHANNELS = [
     'content_marketing'
 ]
 
+ARCHETYPES = [
+    'steady_grower',
+    'seasonal_business',
+    'enterprise_pilot',
+    'price_sensitive',
+    'failed_adoption'
+]
+
 PLAN_NAMES = ['Basic', 'Pro', 'Enterprise']
 CUSTOMER_STATUSES = ['active', 'churned']
 SUBSCRIPTION_STATUSES = ['active', 'cancelled', 'paused']
 BILLING_TYPES = ['subscription', 'upgrade', 'downgrade', 'refund']
 BILLING_STATUSES = ['success', 'failed', 'pending']
+BILLING_CYCLES = ['monthly', 'annual']
 
 
@@ -1,15 +1,110 @@
-import random
+from collections import OrderedDict
 from datetime import datetime, timedelta
 
+from core.random_streams import RandomStreams
+
+DOWNGRADE_USAGE_THRESHOLD = 0.3
+PROFILE_CACHE_SIZE = 4096
+QUARTERS = ('Q1', 'Q2', 'Q3', 'Q4')
+USAGE_DRAWS = {'base': 0, 'growth': 1, 'data_points': 2, 'projects': 3}
+
 class BehaviorEngine:
-    def __init__(self, archetypes_config, business_rules, geographic_modifiers, industry_modifiers):
+    def __init__(self, archetypes_config, business_rules, geographic_modifiers, industry_modifiers,
+                 profile_cache_size=PROFILE_CACHE_SIZE, random_streams=None):
+        self.random_streams = random_streams or RandomStreams(business_rules.get('RANDOM_SEED'))
+        self._profile_cache = OrderedDict()
+        self.profile_cache_size = profile_cache_size
+        self.profile_cache_hits = 0
+        self.profile_cache_misses = 0
+
         self.archetypes = archetypes_config
         self.business_rules = business_rules
         self.geo_modifiers = geographic_modifiers
         self.industry_modifiers = industry_modifiers
         self.plans = {plan['name']: plan for plan in business_rules['PLANS']}
 
+    @property
+    def archetypes(self):
+        return self._archetypes
+
+    @archetypes.setter
+    def archetypes(self, archetypes_config):
+        self._archetypes = archetypes_config
+        self.invalidate_profile_cache()
+
+    @property
+    def geo_modifiers(self):
+        return self._geo_modifiers
+
+    @geo_modifiers.setter
+    def geo_modifiers(self, geographic_modifiers):
+        self._geo_modifiers = geographic_modifiers
+        self.invalidate_profile_cache()
+
+    @property
+    def industry_modifiers(self):
+        return self._industry_modifiers
+
+    @industry_modifiers.setter
+    def industry_modifiers(self, industry_modifiers):
+        self._industry_modifiers = industry_modifiers
+        self.invalidate_profile_cache()
+
+    def invalidate_profile_cache(self):
+        """Drop cached profiles; call after mutating archetype or modifier configs in place."""
+        self._profile_cache.clear()
+
+    def profile_cache_info(self):
+        return {
+            'hits': self.profile_cache_hits,
+            'misses': self.profile_cache_misses,
+            'size': len(self._profile_cache),
+            'max_size': self.profile_cache_size
+        }
+
     def get_monthly_behavior(self, customer, month):
+        """Return the (shared, read-only) behavior profile for a customer in a given month."""
+        key = (
+            customer['archetype'], customer['geography'], customer['industry'],
+            self._get_quarter(month), self._get_loyalty_factor(month)
+        )
+        behavior = self._profile_cache.get(key)
+        if behavior is not None:
+            self._profile_cache.move_to_end(key)
+            self.profile_cache_hits += 1
+            return behavior
+
+        self.profile_cache_misses += 1
+        behavior = self._build_monthly_behavior(customer, month)
+        self._profile_cache[key] = behavior
+        if len(self._profile_cache) > self.profile_cache_size:
+            self._profile_cache.popitem(last=False)
+        return behavior
+
+    def evaluate_month(self, customer, month, tenure_month, current_plan_name, previous_usage,
+                       usage_history, payment_failures=0):
+        """Usage, plan-change and churn decisions for one customer-month from a single profile lookup."""
+        behavior = self.get_monthly_behavior(customer, tenure_month)
+        usage = self._calculate_usage(customer, behavior, tenure_month, current_plan_name, previous_usage)
+
+        upgrade_threshold = self._resolve_upgrade_threshold(customer, behavior, month)
+        if usage['usage_percentage'] >= upgrade_threshold:
+            upgrade = (True, self._get_target_upgrade_plan(current_plan_name, customer))
+        else:
+            upgrade = (False, current_plan_name)
+
+        churn_probability = self._calculate_churn_risk(
+            customer, behavior, tenure_month, [*usage_history, usage], payment_failures
+        )
+
+        return {
+            'usage': usage,
+            'upgrade': upgrade,
+            'downgrade': self.should_downgrade(customer, usage, current_plan_name, month),
+            'churn_probability': churn_probability
+        }
+
+    def _build_monthly_behavior(self, customer, month):
         archetype = self.archetypes[customer['archetype']]
         behavior = archetype.copy()
         behavior = self._apply_geographic_modifiers(behavior, customer['geography'])
@@ -20,13 +115,19 @@ class BehaviorEngine:
     
     def calculate_usage(self, customer, month, current_plan_name, previous_usage=None):
         behavior = self.get_monthly_behavior(customer, month)
+        return self._calculate_usage(customer, behavior, month, current_plan_name, previous_usage)
+
+    def _calculate_usage(self, customer, behavior, month, current_plan_name, previous_usage):
         current_plan = self.plans[current_plan_name]
-        base_usage_pct = self._get_base_usage_percentage(customer, behavior)
+        streams = self.random_streams
+        base_usage_pct = self._get_base_usage_percentage(customer, behavior, month)
 
         if previous_usage:
             growth_rate = behavior.get('monthly_growth_rate', 0)
             growth_variance = behavior.get('growth_variance', 0.05)
-            actual_growth = growth_rate + random.uniform(-growth_variance, growth_variance)
+            actual_growth = growth_rate + streams.uniform(
+                'usage', customer['id'], month, USAGE_DRAWS['growth'], -growth_variance, growth_variance
+            )
             base_usage_pct *= (1 + actual_growth)
 
         seasonal_mult = self._get_seasonal_multiplier(customer, behavior, month)
@@ -36,9 +137,12 @@ class BehaviorEngine:
         base_usage_pct *= industry_mult
 
         api_calls = int(current_plan['api_call_limit'] * base_usage_pct)
-        data_points = int(api_calls * random.uniform(1.5, 3.0))
+        data_points = int(api_calls * streams.uniform('usage', customer['id'], month, USAGE_DRAWS['data_points'], 1.5, 3.0))
         queries = int(api_calls * 0.1)
-        projects = min(random.randint(1, 3), current_plan['max_projects'])
+        projects = min(
+            streams.randint('usage', customer['id'], month, USAGE_DRAWS['projects'], 1, 3),
+            current_plan['max_projects']
+        )
 
         return {
             'api_calls': max(0, api_calls),
@@ -49,8 +153,20 @@ class BehaviorEngine:
         }
     
     def should_upgrade(self, customer, current_usage, current_plan_name, month):
-        behavior = self.get_monthly_behavior(customer, month)
         usage_pct = current_usage['usage_percentage']
+        upgrade_threshold = self.get_upgrade_threshold(customer, month)
+
+        if usage_pct >= upgrade_threshold:
+            target_plan = self._get_target_upgrade_plan(current_plan_name, customer)
+            return True, target_plan
+        
+        return False, current_plan_name
+    
+    def get_upgrade_threshold(self, customer, month):
+        behavior = self.get_monthly_behavior(customer, month)
+        return self._resolve_upgrade_threshold(customer, behavior, month)
+
+    def _resolve_upgrade_threshold(self, customer, behavior, month):
         upgrade_threshold = behavior.get('upgrade_threshold', 0.8)
 
         if customer['archetype'] == 'price_sensitive':
@@ -58,11 +174,7 @@ class BehaviorEngine:
         elif customer['archetype'] == 'enterprise_pilot' and month >= 2:
             upgrade_threshold = 0.6
 
-        if usage_pct >= upgrade_threshold:
-            target_plan = self._get_target_upgrade_plan(current_plan_name, customer)
-            return True, target_plan
-        
-        return False, current_plan_name
+        return upgrade_threshold
     
     def should_downgrade(self, customer, current_usage, current_plan_name, month):
         if customer['archetype'] != 'seasonal_business':
@@ -70,7 +182,7 @@ class BehaviorEngine:
         
         usage_pct = current_usage['usage_percentage']
         quarter = self._get_quarter(month)
-        if quarter in ['Q2', 'Q3'] and usage_pct < 0.3:
+        if quarter in ['Q2', 'Q3'] and usage_pct < DOWNGRADE_USAGE_THRESHOLD:
             if current_plan_name == 'Enterprise':
                 return True, 'Pro'
             elif current_plan_name == 'Pro':
@@ -80,6 +192,9 @@ class BehaviorEngine:
 
     def calculate_churn_risk(self, customer, month, usage_history, payment_failures=0):
         behavior = self.get_monthly_behavior(customer, month)
+        return self._calculate_churn_risk(customer, behavior, month, usage_history, payment_failures)
+
+    def _calculate_churn_risk(self, customer, behavior, month, usage_history, payment_failures):
         base_churn_rate = behavior.get('base_churn_rate', 0.02)
 
         if customer['archetype'] == 'failed_adoption':
@@ -135,8 +250,7 @@ class BehaviorEngine:
         return modified_behavior
     
     def _apply_tenure_modifiers(self, behavior, customer, month):
-        tenure_months = month
-        loyalty_factor = min(1.2, 1 + (tenure_months * 0.01))
+        loyalty_factor = self._get_loyalty_factor(month)
         modified_behavior = behavior.copy()
         
         if 'base_churn_rate' in modified_behavior:
@@ -144,13 +258,16 @@ class BehaviorEngine:
 
         return modified_behavior
     
-    def _get_base_usage_percentage(self, customer, behavior):
+    def _get_loyalty_factor(self, tenure_months):
+        return min(1.2, 1 + (tenure_months * 0.01))
+    
+    def _get_base_usage_percentage(self, customer, behavior, month):
         if customer['archetype'] == 'failed_adoption':
             return behavior.get('low_usage_multiplier', 0.2)
         elif customer['archetype'] == 'price_sensitive':
             return behavior.get('usage_management', 0.85)
         else:
-            return random.uniform(0.4, 0.7)
+            return self.random_streams.uniform('usage', customer['id'], month, USAGE_DRAWS['base'], 0.4, 0.7)
         
     def _get_seasonal_multiplier(self, customer, behavior, month):
         return behavior.get('seasonal_multiplier', 1.0)
@@ -180,14 +297,8 @@ class BehaviorEngine:
         return current_plan_name
     
     def _get_quarter(self, month):
-        quarter_map = {
-            1: 'Q1', 2: 'Q1', 3: 'Q1',
-            4: 'Q2', 5: 'Q2', 6: 'Q2', 
-            7: 'Q3', 8: 'Q3', 9: 'Q3',
-            10: 'Q4', 11: 'Q4', 12: 'Q4'
-        }
         month_in_year = ((month - 1) % 12) + 1
-        return quarter_map[month_in_year]
+        return QUARTERS[(month_in_year - 1) // 3]
     
     def _get_average_usage_trend(self, usage_history):
         if not usage_history:
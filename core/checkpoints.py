@@ -0,0 +1,30 @@
+import gzip
+import os
+import pickle
+
+CHECKPOINT_VERSION = 1
+CHECKPOINT_COMPRESSION = 1
+
+
+def save_checkpoint(path, checkpoint):
+    """Pickle a checkpoint dict to a gzip file, replacing any previous checkpoint at path atomically.
+
+    The checkpoint is written to a temporary file first, so a run that dies
+    mid-write still leaves the previous month's checkpoint readable.
+    """
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    temporary_path = f'{path}.tmp'
+    with gzip.open(temporary_path, 'wb', compresslevel=CHECKPOINT_COMPRESSION) as f:
+        pickle.dump({'version': CHECKPOINT_VERSION, **checkpoint}, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(temporary_path, path)
+
+
+def load_checkpoint(path):
+    with gzip.open(path, 'rb') as f:
+        checkpoint = pickle.load(f)
+    if checkpoint.get('version') != CHECKPOINT_VERSION:
+        raise ValueError(f"{path} is a version {checkpoint.get('version')} checkpoint; "
+                         f"this build reads version {CHECKPOINT_VERSION}")
+    return checkpoint
@@ -0,0 +1,25 @@
+class CustomerRecord:
+    """Slotted, read-only view of the customer attributes the simulation needs."""
+
+    __slots__ = ('id', 'archetype', 'geography', 'industry', 'signup_date')
+
+    def __init__(self, id, archetype, geography, industry, signup_date):
+        self.id = id
+        self.archetype = archetype
+        self.geography = geography
+        self.industry = industry
+        self.signup_date = signup_date
+
+    def __getitem__(self, key):
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def get(self, key, default=None):
+        return getattr(self, key, default)
+
+
+def build_customer_records(customers_df):
+    columns = [customers_df[field].tolist() for field in CustomerRecord.__slots__]
+    return {values[0]: CustomerRecord(*values) for values in zip(*columns)}
@@ -0,0 +1,35 @@
+import numpy as np
+import pandas as pd
+from datetime import datetime
+
+SIMULATION_START = datetime(2023, 1, 1)
+DAYS_PER_MONTH = 30
+
+_EPOCH = np.datetime64(SIMULATION_START.date(), 'D')
+
+
+def to_day_offsets(dates):
+    """Convert ISO date strings (or anything pandas can parse) to int64 days since SIMULATION_START.
+
+    Each distinct value is parsed once, which matters for event tables where
+    millions of rows share a few hundred dates.
+    """
+    dates = np.asarray(dates)
+    if dates.dtype.kind == 'M':
+        return (dates.astype('datetime64[D]') - _EPOCH).astype(np.int64)
+    codes, unique_dates = pd.factorize(dates)
+    parsed = pd.to_datetime(pd.Series(unique_dates)).to_numpy().astype('datetime64[D]')
+    return (parsed - _EPOCH).astype(np.int64)[codes]
+
+
+def to_datetime64(days):
+    return _EPOCH + np.asarray(days, dtype=np.int64).astype('timedelta64[D]')
+
+
+def to_dates(days):
+    """Day offsets as datetime64[s] values; negative offsets mark open-ended dates and become NaT."""
+    days = np.asarray(days, dtype=np.int64)
+    dates = to_datetime64(days).astype('datetime64[s]')
+    dates[days < 0] = np.datetime64('NaT')
+    return dates
+
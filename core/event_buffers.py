@@ -0,0 +1,89 @@
+import numpy as np
+
+MONTHLY_USAGE_FIELDS = {
+    'customer_id': np.int32,
+    'plan': np.int64,
+    'api_calls': np.int64,
+    'data_points_ingested': np.int64,
+    'queries_executed': np.int64,
+    'projects_active': np.int32
+}
+USAGE_EVENT_FIELDS = {
+    'customer_id': np.int32,
+    'day': np.int32,
+    'api_calls': np.int64,
+    'data_points_ingested': np.int64,
+    'queries_executed': np.int64,
+    'projects_active': np.int32,
+    'feature_mask': np.int16
+}
+BILLING_TRANSACTION_FIELDS = {
+    'customer_id': np.int32,
+    'day': np.int32,
+    'amount': np.int64,
+    'type': np.int8,
+    'success': np.bool_
+}
+
+BILLING_TYPES = np.array(['subscription', 'upgrade', 'refund'], dtype=object)
+BILLING_TYPE_CODES = {name: code for code, name in enumerate(BILLING_TYPES)}
+BILLING_STATUSES = np.array(['failed', 'success'], dtype=object)
+
+
+class EventBuffer:
+    """Growable struct-of-arrays buffer: one preallocated, typed NumPy column per field.
+
+    Rows are written in place with append() or in bulk with extend(); drain()
+    hands the filled prefix of each column out as a view, so building a
+    DataFrame from it does not copy the data again.
+    """
+
+    def __init__(self, fields, capacity=1024):
+        self.fields = dict(fields)
+        self._initial_capacity = capacity
+        self._count = 0
+        self._allocate(capacity)
+
+    def __len__(self):
+        return self._count
+
+    def append(self, row):
+        """Write one row given as a tuple in field order."""
+        if self._count == self._capacity:
+            self._reserve(self._count + 1)
+        position = self._count
+        for column, value in zip(self._column_list, row):
+            column[position] = value
+        self._count += 1
+
+    def extend(self, columns):
+        """Write a batch given as a dict of equal-length arrays keyed by field name."""
+        count = len(columns[next(iter(self.fields))])
+        self._reserve(self._count + count)
+        start, end = self._count, self._count + count
+        for name, column in self._columns.items():
+            column[start:end] = columns[name]
+        self._count = end
+
+    def drain(self):
+        """Return the filled columns and start over on fresh storage sized for a similar batch."""
+        drained = {name: column[:self._count] for name, column in self._columns.items()}
+        self._allocate(max(self._initial_capacity, self._count))
+        self._count = 0
+        return drained
+
+    def _allocate(self, capacity):
+        self._capacity = capacity
+        self._columns = {name: np.empty(capacity, dtype=dtype) for name, dtype in self.fields.items()}
+        self._column_list = list(self._columns.values())
+
+    def _reserve(self, required):
+        if required <= self._capacity:
+            return
+        new_capacity = max(required, 2 * self._capacity)
+        for name, column in self._columns.items():
+            grown = np.empty(new_capacity, dtype=column.dtype)
+            grown[:self._count] = column[:self._count]
+            self._columns[name] = grown
+        self._column_list = list(self._columns.values())
+        self._capacity = new_capacity
@@ -0,0 +1,38 @@
+import numpy as np
+import pandas as pd
+
+from config.business_rules import FEATURE_BITS
+
+FEATURE_SEPARATOR = ','
+
+
+def feature_mask(features):
+    """Bitmask for an iterable of feature names."""
+    mask = 0
+    for feature in features:
+        mask |= 1 << FEATURE_BITS[feature]
+    return mask
+
+
+def feature_names(mask):
+    """Feature names set in one mask, in bit order."""
+    return [feature for feature, bit in sorted(FEATURE_BITS.items(), key=lambda item: item[1]) if mask >> bit & 1]
+
+
+def uses_feature(masks, feature):
+    """Boolean array: which masks include feature. The vectorized form of "customers using X"."""
+    return (np.asarray(masks) & (1 << FEATURE_BITS[feature])) != 0
+
+
+def masks_from_labels(labels):
+    """Masks for comma-joined feature lists such as the feature_used strings of older outputs."""
+    codes, unique_labels = pd.factorize(np.asarray(labels, dtype=object))
+    masks = np.array([feature_mask(label.split(FEATURE_SEPARATOR)) for label in unique_labels], dtype=np.int64)
+    return masks[codes]
+
+
+def labels_from_masks(masks):
+    """Readable comma-joined feature lists for an array of masks; each distinct mask is decoded once."""
+    unique_masks, inverse = np.unique(np.asarray(masks, dtype=np.int64), return_inverse=True)
+    labels = np.array([FEATURE_SEPARATOR.join(feature_names(mask)) for mask in unique_masks], dtype=object)
+    return labels[inverse]
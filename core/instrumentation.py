@@ -0,0 +1,158 @@
+import time
+import tracemalloc
+from collections import defaultdict
+from contextlib import contextmanager
+from functools import wraps
+
+PROGRESS_INTERVAL = 1.0
+
+
+class SimulationMetrics:
+    """Phase timers, counters, per-month records and peak memory for one simulation run.
+
+    Counters are always kept (they are plain integer increments). Phase timing
+    and tracemalloc only run when enabled; instrument() swaps timed wrappers in
+    as instance attributes, so a disabled run calls the original methods
+    directly. Phases may nest, in which case the inner time is counted in both.
+    """
+
+    def __init__(self, enabled=False, track_memory=True):
+        self.enabled = enabled
+        self.track_memory = enabled and track_memory
+        self.phase_seconds = defaultdict(float)
+        self.phase_calls = defaultdict(int)
+        self.counters = defaultdict(int)
+        self.months = []
+        self.total_seconds = 0.0
+        self.peak_memory_bytes = 0
+        self._run_start = None
+        self._month_start = None
+        self._month_counters = {}
+        self._owns_tracemalloc = False
+
+    def instrument(self, target, phases):
+        """Time target's methods under the given phases: {phase: [method names]}."""
+        if not self.enabled:
+            return
+        for phase, method_names in phases.items():
+            for name in method_names:
+                setattr(target, name, self._timed(phase, getattr(target, name)))
+
+    def _timed(self, phase, method):
+        seconds, calls, clock = self.phase_seconds, self.phase_calls, time.perf_counter
+
+        @wraps(method)
+        def timed(*args, **kwargs):
+            start = clock()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                seconds[phase] += clock() - start
+                calls[phase] += 1
+        return timed
+
+    @contextmanager
+    def phase(self, name):
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phase_seconds[name] += time.perf_counter() - start
+            self.phase_calls[name] += 1
+
+    def count(self, name, amount=1):
+        self.counters[name] += amount
+
+    def start_run(self):
+        for values in (self.phase_seconds, self.phase_calls, self.counters):
+            values.clear()
+        self.months = []
+        self.peak_memory_bytes = 0
+        self._run_start = time.perf_counter()
+        if self.track_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._owns_tracemalloc = True
+
+    def start_month(self, month):
+        if not self.enabled:
+            return
+        self._month_start = time.perf_counter()
+        self._month_counters = dict(self.counters)
+        if self.track_memory:
+            tracemalloc.reset_peak()
+
+    def end_month(self, month):
+        if not self.enabled:
+            return
+        record = {'month': month, 'seconds': round(time.perf_counter() - self._month_start, 6)}
+        for name, value in self.counters.items():
+            record[name] = value - self._month_counters.get(name, 0)
+        if self.track_memory:
+            peak = tracemalloc.get_traced_memory()[1]
+            record['peak_memory_bytes'] = peak
+            self.peak_memory_bytes = max(self.peak_memory_bytes, peak)
+        self.months.append(record)
+
+    def finish_run(self):
+        if self._run_start is not None:
+            self.total_seconds = time.perf_counter() - self._run_start
+        if self._owns_tracemalloc:
+            tracemalloc.stop()
+            self._owns_tracemalloc = False
+
+    def merge(self, report):
+        """Fold in a report from another process: counters and phase times add, month records combine."""
+        for name, value in report['counters'].items():
+            self.counters[name] += value
+        for name, phase in report['phases'].items():
+            self.phase_seconds[name] += phase['seconds']
+            self.phase_calls[name] += phase['calls']
+        if report['peak_memory_bytes'] is not None:
+            self.peak_memory_bytes = max(self.peak_memory_bytes, report['peak_memory_bytes'])
+        for index, record in enumerate(report['months']):
+            if index == len(self.months):
+                self.months.append(dict(record))
+                continue
+            merged = self.months[index]
+            for name, value in record.items():
+                if name == 'month':
+                    continue
+                if name in ('seconds', 'peak_memory_bytes'):
+                    merged[name] = max(merged.get(name, 0), value)
+                else:
+                    merged[name] = merged.get(name, 0) + value
+
+    def report(self, engine=None):
+        customer_months = self.counters.get('customer_months', 0)
+        return {
+            'engine': engine,
+            'total_seconds': round(self.total_seconds, 6),
+            'customer_months': customer_months,
+            'customer_months_per_second': round(customer_months / self.total_seconds, 2) if self.total_seconds else None,
+            'peak_memory_bytes': self.peak_memory_bytes or None,
+            'counters': dict(self.counters),
+            'phases': {
+                name: {'seconds': round(seconds, 6), 'calls': self.phase_calls[name]}
+                for name, seconds in sorted(self.phase_seconds.items(), key=lambda item: -item[1])
+            },
+            'months': self.months
+        }
+
+
+class ProgressReporter:
+    """Prints month progress at most once per interval, plus the first and last month."""
+
+    def __init__(self, total_months, interval=PROGRESS_INTERVAL):
+        self.total_months = total_months
+        self.interval = interval
+        self._last_report = None
+
+    def month(self, month, churned=0):
+        now = time.monotonic()
+        due = self._last_report is None or now - self._last_report >= self.interval
+        if due or month == self.total_months:
+            print(f"Simulating month {month}/{self.total_months}... ({churned} churned so far)")
+            self._last_report = now
@@ -0,0 +1,185 @@
+import os
+import pickle
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from core.behavior_engine import BehaviorEngine
+from core.random_streams import RandomStreams
+from core.timeline_simulator import TimelineSimulator
+from core.vectorized_simulator import VectorizedTimelineSimulator
+from generators.subscription_generator import SubscriptionGenerator
+
+CUSTOMER_COLUMNS = ('ids', 'signup_day', 'segment')
+
+_attached_inputs = {}
+
+
+class ParallelTimelineSimulator(TimelineSimulator):
+    """Shards customers across a process pool; each shard runs the vectorized engine.
+
+    The encoded customer table and the compiled config (behavior configs plus the
+    per-segment tables) are placed in shared memory once and attached by every
+    worker, instead of being pickled into each task.
+    """
+
+    def __init__(self, behavior_engine, subscription_generator, config, workers=None):
+        if config.get('CHECKPOINT_PATH'):
+            raise ValueError("The parallel engine does not write checkpoints; checkpoint with the vectorized engine")
+        super().__init__(behavior_engine, subscription_generator, config)
+        self.workers = workers or config.get('SIMULATION_WORKERS') or os.cpu_count() or 1
+        self.engine = VectorizedTimelineSimulator(behavior_engine, subscription_generator, config)
+        self.metrics.track_memory = False
+
+    def simulate(self, customers_df):
+        print(f"Starting parallel simulation for {len(customers_df)} customers over "
+              f"{self.simulation_months} months on {self.workers} workers...")
+        self.metrics.start_run()
+
+        with self.metrics.phase('encode_customers'):
+            columns = self.engine.encode_customers(customers_df)
+            self.engine.segment_tables = self.engine.compile_segments(columns['segments'])
+
+        n = len(customers_df)
+        shard_bounds = self._shard_bounds(n)
+        first_id = self.subscription_generator.subscription_id_counter
+        id_block = max(stop - start for start, stop in shard_bounds) * self.simulation_months
+
+        customer_table = np.stack([columns[name] for name in CUSTOMER_COLUMNS])
+        compiled_config = pickle.dumps({
+            'config': self.config,
+            'archetypes': self.behavior_engine.archetypes,
+            'business_rules': self.behavior_engine.business_rules,
+            'geographic_modifiers': self.behavior_engine.geo_modifiers,
+            'industry_modifiers': self.behavior_engine.industry_modifiers,
+            'segment_tables': self.engine.segment_tables,
+            'random_seed': self.random_streams.seed
+        }, protocol=pickle.HIGHEST_PROTOCOL)
+
+        customers_shm = shared_memory.SharedMemory(create=True, size=max(1, customer_table.nbytes))
+        config_shm = shared_memory.SharedMemory(create=True, size=len(compiled_config))
+        try:
+            np.ndarray(customer_table.shape, dtype=customer_table.dtype, buffer=customers_shm.buf)[:] = customer_table
+            config_shm.buf[:len(compiled_config)] = compiled_config
+
+            tasks = [
+                {
+                    'customers_shm': customers_shm.name,
+                    'customers_shape': customer_table.shape,
+                    'config_shm': config_shm.name,
+                    'config_size': len(compiled_config),
+                    'start': start,
+                    'stop': stop,
+                    'first_subscription_id': first_id + start,
+                    'new_subscription_id': first_id + n + shard * id_block
+                }
+                for shard, (start, stop) in enumerate(shard_bounds)
+            ]
+
+            with self.metrics.phase('shards'), ProcessPoolExecutor(max_workers=self.workers) as executor:
+                futures = [executor.submit(_simulate_shard, task) for task in tasks]
+                for completed, _ in enumerate(as_completed(futures), start=1):
+                    print(f"Completed shard {completed}/{len(tasks)}")
+                shard_results = [future.result() for future in futures]
+        finally:
+            customers_shm.close()
+            customers_shm.unlink()
+            config_shm.close()
+            config_shm.unlink()
+
+        with self.metrics.phase('merge_shards'):
+            raw = self._merge_shards(shard_results, first_id + n)
+        for shard in shard_results:
+            if 'metrics' in shard:
+                self.metrics.merge(shard['metrics'])
+        subscription_ids = raw['subscriptions']['id']
+        self.subscription_generator.subscription_id_counter = int(subscription_ids.max()) + 1 if len(subscription_ids) else first_id
+
+        print("Updating customer final states...")
+        with self.metrics.phase('export'):
+            results = self.engine.export_results(customers_df, columns['ids'], raw)
+        self.metrics.finish_run()
+
+        churned_count = (customers_df['status'] == 'churned').sum()
+        print(f"Updated {churned_count} customers to churned status")
+        print("Simulation completed!")
+        if self.metrics.enabled:
+            results['metrics'] = self.metrics.report(type(self).__name__)
+        return results
+
+    def _resume(self, checkpoint, sink=None, extra_months=0):
+        raise ValueError("The parallel engine does not write checkpoints; checkpoint with the vectorized engine")
+
+    def _shard_bounds(self, n):
+        shards = max(1, min(self.workers, n))
+        edges = np.linspace(0, n, shards + 1).astype(np.int64)
+        return [(int(edges[i]), int(edges[i + 1])) for i in range(shards)]
+
+    def _merge_shards(self, shard_results, first_new_id):
+        merged = {
+            'active': np.concatenate([r['active'] for r in shard_results]),
+            'plan': np.concatenate([r['plan'] for r in shard_results])
+        }
+        for table in ('subscriptions', 'usage_events', 'billing_transactions'):
+            merged[table] = {
+                key: np.concatenate([r[table][key] for r in shard_results])
+                for key in shard_results[0][table]
+            }
+        subscriptions = merged['subscriptions']
+        subscriptions['id'] = self._renumber_new_subscriptions(subscriptions, first_new_id)
+        order = subscriptions['id'].argsort(kind='stable')
+        merged['subscriptions'] = {key: values[order] for key, values in subscriptions.items()}
+        return merged
+
+    def _renumber_new_subscriptions(self, subscriptions, first_new_id):
+        # Shards number the subscriptions they open from their own id blocks; the serial engines open them
+        # month by month in customer order, so renumber by (start_day, customer) to hand out the same ids
+        ids = subscriptions['id'].copy()
+        new = np.flatnonzero(ids >= first_new_id)
+        order = np.lexsort((subscriptions['customer'][new], subscriptions['start_day'][new]))
+        ids[new[order]] = np.arange(first_new_id, first_new_id + len(new))
+        return ids
+
+
+def _attach_shared_inputs(task):
+    key = (task['customers_shm'], task['config_shm'])
+    if key not in _attached_inputs:
+        # A worker reused for a later run drops the previous run's mappings before attaching the new ones
+        for attached in list(_attached_inputs):
+            customers_shm, config_shm, _, _ = _attached_inputs.pop(attached)
+            customers_shm.close()
+            config_shm.close()
+        customers_shm = shared_memory.SharedMemory(name=task['customers_shm'])
+        config_shm = shared_memory.SharedMemory(name=task['config_shm'])
+        customer_table = np.ndarray(task['customers_shape'], dtype=np.int64, buffer=customers_shm.buf)
+        compiled_config = pickle.loads(config_shm.buf[:task['config_size']])
+        _attached_inputs[key] = (customers_shm, config_shm, customer_table, compiled_config)
+    return _attached_inputs[key][2:]
+
+
+def _simulate_shard(task):
+    customer_table, compiled = _attach_shared_inputs(task)
+    start, stop = task['start'], task['stop']
+
+    behavior_engine = BehaviorEngine(
+        compiled['archetypes'],
+        compiled['business_rules'],
+        compiled['geographic_modifiers'],
+        compiled['industry_modifiers'],
+        random_streams=RandomStreams(compiled['random_seed'])
+    )
+    subscription_generator = SubscriptionGenerator(compiled['config'])
+    subscription_generator.subscription_id_counter = task['first_subscription_id']
+
+    simulator = VectorizedTimelineSimulator(behavior_engine, subscription_generator, compiled['config'])
+    simulator.verbose = False
+    simulator.segment_tables = compiled['segment_tables']
+
+    columns = {name: customer_table[row, start:stop] for row, name in enumerate(CUSTOMER_COLUMNS)}
+    raw = simulator.run_columns(columns, new_subscription_id=task['new_subscription_id'])
+
+    raw['subscriptions']['customer'] = raw['subscriptions']['customer'] + start
+    if simulator.metrics.enabled:
+        raw['metrics'] = simulator.metrics.report()
+    return raw
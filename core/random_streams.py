@@ -0,0 +1,81 @@
+import numpy as np
+
+STREAMS = ('customer_profile', 'usage', 'weekly_usage', 'billing', 'churn', 'lifecycle')
+
+_MASK = 0xFFFFFFFFFFFFFFFF
+_GOLDEN = 0x9E3779B97F4A7C15
+_MIX_1 = 0xBF58476D1CE4E5B9
+_MIX_2 = 0x94D049BB133111EB
+_UNIT = 1.0 / (1 << 53)
+
+
+def _mix(z):
+    z = ((z ^ (z >> 30)) * _MIX_1) & _MASK
+    z = ((z ^ (z >> 27)) * _MIX_2) & _MASK
+    return z ^ (z >> 31)
+
+
+def _mix_array(z):
+    z = (z ^ (z >> np.uint64(30))) * np.uint64(_MIX_1)
+    z = (z ^ (z >> np.uint64(27))) * np.uint64(_MIX_2)
+    return z ^ (z >> np.uint64(31))
+
+
+class RandomStreams:
+    """Counter-based random numbers keyed by (seed, stream, entity, month, slot).
+
+    Every draw is a pure function of its key, so results do not depend on how
+    many other draws happened before it or in which order customers are
+    processed. The scalar and array methods return bit-identical values for
+    the same key, which keeps the per-customer and columnar engines in step.
+    """
+
+    def __init__(self, seed=None):
+        if seed is None:
+            seed = np.random.SeedSequence().entropy
+        self.seed = int(seed)
+        key = int(np.random.SeedSequence(self.seed).generate_state(1, dtype=np.uint64)[0])
+        self._stream_keys = {
+            name: _mix(key ^ ((index + 1) * _GOLDEN & _MASK)) for index, name in enumerate(STREAMS)
+        }
+
+    def random(self, stream, entity, month, slot=0):
+        z = _mix(self._stream_keys[stream] ^ (int(entity) & _MASK))
+        z = _mix(z ^ int(month))
+        z = _mix(z ^ int(slot))
+        return (z >> 11) * _UNIT
+
+    def uniform(self, stream, entity, month, slot, low, high):
+        return low + (high - low) * self.random(stream, entity, month, slot)
+
+    def randint(self, stream, entity, month, slot, low, high):
+        """Integer in [low, high], inclusive like random.randint."""
+        return low + int(self.random(stream, entity, month, slot) * (high - low + 1))
+
+    def choice_index(self, stream, entity, month, slot, cumulative_weights):
+        target = self.random(stream, entity, month, slot) * cumulative_weights[-1]
+        for index, bound in enumerate(cumulative_weights):
+            if target < bound:
+                return index
+        return len(cumulative_weights) - 1
+
+    def random_array(self, stream, entities, month, slot=0):
+        entities, month, slot = np.broadcast_arrays(np.atleast_1d(entities), month, slot)
+        z = _mix_array(np.uint64(self._stream_keys[stream]) ^ entities.astype(np.uint64))
+        z = _mix_array(z ^ month.astype(np.uint64))
+        z = _mix_array(z ^ slot.astype(np.uint64))
+        return (z >> np.uint64(11)).astype(np.float64) * _UNIT
+
+    def uniform_array(self, stream, entities, month, slot, low, high):
+        return low + (high - low) * self.random_array(stream, entities, month, slot)
+
+    def randint_array(self, stream, entities, month, slot, low, high):
+        draws = self.random_array(stream, entities, month, slot)
+        return low + np.floor(draws * (high - low + 1)).astype(np.int64)
+
+    def choice_index_array(self, stream, entities, month, slot, cumulative_weights):
+        cumulative_weights = np.asarray(cumulative_weights, dtype=np.float64)
+        target = self.random_array(stream, entities, month, slot) * cumulative_weights[-1]
+        return np.minimum(
+            np.searchsorted(cumulative_weights, target, side='right'), len(cumulative_weights) - 1
+        )
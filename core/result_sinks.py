@@ -0,0 +1,313 @@
+import copy
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from core.schema import OPEN_CATEGORY, TABLE_SCHEMAS, empty_frame
+
+RESULT_TABLES = ('subscriptions', 'usage_events', 'billing_transactions')
+
+SUBSCRIPTION_COLUMNS = list(TABLE_SCHEMAS['subscriptions'])
+USAGE_EVENT_COLUMNS = list(TABLE_SCHEMAS['usage_events'])
+BILLING_TRANSACTION_COLUMNS = list(TABLE_SCHEMAS['billing_transactions'])
+
+
+class ResultSink:
+    """Receives simulation batches as they are produced.
+
+    Each batch is a dict with 'month', 'final' and one DataFrame per entry in
+    RESULT_TABLES. Usage events and billing transactions hold the rows created
+    that month; subscriptions hold rows that were closed that month, so every
+    subscription is delivered exactly once. The final batch carries the
+    subscriptions still open at the end of the run plus the 'customers' table
+    with final status and plan.
+
+    checkpoint_state() describes the output written so far, and
+    restore_state() rolls a fresh sink on the same output back to it, so a
+    resumed simulation neither loses nor repeats rows. Sinks that cannot roll
+    back keep no state.
+    """
+
+    def write_batch(self, batch):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+    def checkpoint_state(self):
+        return None
+
+    def restore_state(self, state):
+        pass
+
+
+class MemorySink(ResultSink):
+    def __init__(self):
+        self.batches = {table: [] for table in RESULT_TABLES}
+        self.customers = None
+
+    def write_batch(self, batch):
+        for table in RESULT_TABLES:
+            if len(batch[table]):
+                self.batches[table].append(batch[table])
+        if batch['final']:
+            self.customers = batch['customers']
+
+    def checkpoint_state(self):
+        return {table: list(frames) for table, frames in self.batches.items()}
+
+    def restore_state(self, state):
+        self.batches = {table: list(frames) for table, frames in state.items()}
+
+    def results(self):
+        results = {'customers': self.customers}
+        for table in RESULT_TABLES:
+            frames = self.batches[table]
+            results[table] = pd.concat(frames, ignore_index=True) if frames else empty_frame(table)
+        results['subscriptions'] = results['subscriptions'].sort_values('id', ignore_index=True)
+        return results
+
+
+class CsvSink(ResultSink):
+    """Appends each batch to <output_dir>/<table>.csv, writing the header once."""
+
+    def __init__(self, output_dir):
+        self.output_dir = output_dir
+        os.makedirs(output_dir, exist_ok=True)
+        self._started = set()
+
+    def write_batch(self, batch):
+        for table in RESULT_TABLES:
+            self._append(table, batch[table])
+        if batch['final']:
+            self.write_tables({'customers': batch['customers']})
+
+    def checkpoint_state(self):
+        return {table: os.path.getsize(self._path(table)) for table in self._started}
+
+    def restore_state(self, state):
+        """Truncate each table back to its checkpointed size, dropping rows written after the checkpoint."""
+        for table, size in state.items():
+            os.truncate(self._path(table), size)
+        self._started = set(state)
+
+    def write_tables(self, tables):
+        """Write whole tables such as customers or plans to <table>.csv."""
+        for table, df in tables.items():
+            df.to_csv(self._path(table), index=False)
+
+    def _path(self, table):
+        return os.path.join(self.output_dir, f'{table}.csv')
+
+    def _append(self, table, df):
+        path = self._path(table)
+        first_write = table not in self._started
+        if first_write or len(df):
+            df.to_csv(path, mode='w' if first_write else 'a', header=first_write, index=False)
+            self._started.add(table)
+
+
+class SqlSink(ResultSink):
+    """Appends each batch to raw tables (<prefix><table>) through a SQLAlchemy engine."""
+
+    def __init__(self, engine, table_prefix='raw_'):
+        self.engine = engine
+        self.table_prefix = table_prefix
+
+    def write_batch(self, batch):
+        for table in RESULT_TABLES:
+            if len(batch[table]):
+                batch[table].to_sql(f'{self.table_prefix}{table}', self.engine, if_exists='append', index=False)
+        if batch['final']:
+            batch['customers'].to_sql(f'{self.table_prefix}customers', self.engine, if_exists='replace', index=False)
+
+
+PARQUET_MANIFEST = 'manifest.json'
+PARQUET_PARTITION_COLUMN = 'month'
+PARQUET_PARTITIONS = {'usage_events': 'date', 'billing_transactions': 'transaction_date'}
+PARQUET_SORT_KEYS = {
+    'usage_events': ['customer_id', 'date'],
+    'billing_transactions': ['customer_id', 'transaction_date'],
+    'subscriptions': ['id']
+}
+DICTIONARY_MAX_DISTINCT_RATIO = 0.5
+
+
+def _require_pyarrow():
+    try:
+        import pyarrow as pa
+        import pyarrow.compute as pc
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise ImportError("Parquet output requires pyarrow (pip install pyarrow)") from e
+    return pa, pc, pq
+
+
+def _parquet_types(pa):
+    """Arrow types for every TABLE_SCHEMAS column: categoricals become dictionaries and dates date32."""
+    types = {}
+    for table, schema in TABLE_SCHEMAS.items():
+        types[table] = {}
+        for column, dtype in schema.items():
+            if dtype is OPEN_CATEGORY or isinstance(dtype, pd.CategoricalDtype):
+                types[table][column] = pa.dictionary(pa.int32(), pa.string())
+            elif dtype.kind == 'M':
+                types[table][column] = pa.date32()
+            else:
+                types[table][column] = pa.from_numpy_dtype(dtype)
+    return types
+
+
+class ParquetSink(ResultSink):
+    """Writes each table as a Parquet dataset under <output_dir>/<table>/.
+
+    Columns are typed (narrow integers, date32 dates, dictionary-encoded
+    labels). usage_events and billing_transactions are split into
+    month=YYYY-MM partitions and every file is sorted by its PARQUET_SORT_KEYS.
+    The tables of a batch are written concurrently, and close() writes
+    manifest.json with each table's row count, files and schema.
+    """
+
+    def __init__(self, output_dir, compression='zstd'):
+        self.pa, self.pc, self.pq = _require_pyarrow()
+        self.output_dir = output_dir
+        self.compression = compression
+        self.types = _parquet_types(self.pa)
+        self.manifest = {}
+        self._executor = ThreadPoolExecutor(max_workers=len(RESULT_TABLES) + 1)
+        os.makedirs(output_dir, exist_ok=True)
+
+    def write_batch(self, batch):
+        tables = {table: batch[table] for table in RESULT_TABLES}
+        if batch['final']:
+            tables['customers'] = batch['customers']
+        self.write_tables(tables)
+
+    def write_tables(self, tables):
+        """Write several DataFrames at once; also used for static tables such as plans."""
+        for table in tables:
+            self.manifest.setdefault(table, {'rows': 0, 'files': [], 'schema': None})
+        futures = [self._executor.submit(self._write_table, table, df) for table, df in tables.items()]
+        for future in futures:
+            future.result()
+
+    def close(self):
+        self._executor.shutdown()
+        with open(os.path.join(self.output_dir, PARQUET_MANIFEST), 'w') as f:
+            json.dump({'format': 'parquet', 'tables': self.manifest}, f, indent=2)
+
+    def checkpoint_state(self):
+        return copy.deepcopy(self.manifest)
+
+    def restore_state(self, state):
+        """Return to the checkpointed manifest and delete the part files written after it.
+
+        A resumed run reuses their part numbers, but not necessarily in the same
+        month directory, so a file left behind would be read twice by dataset readers.
+        """
+        self.manifest = copy.deepcopy(state)
+        kept = {os.path.normpath(path) for entry in self.manifest.values() for path in entry['files']}
+        for table in set(self.manifest) | set(RESULT_TABLES) | {'customers'}:
+            for root, _, files in os.walk(os.path.join(self.output_dir, table)):
+                for name in files:
+                    path = os.path.join(root, name)
+                    if name.startswith('part-') and os.path.relpath(path, self.output_dir) not in kept:
+                        os.remove(path)
+
+    def _write_table(self, table, df):
+        if not len(df):
+            return
+        arrow_table = self._to_arrow(table, df)
+        entry = self.manifest[table]
+        entry['schema'] = {field.name: str(field.type) for field in arrow_table.schema}
+
+        sort_keys = [(key, 'ascending') for key in PARQUET_SORT_KEYS.get(table, [])]
+        date_column = PARQUET_PARTITIONS.get(table)
+        if date_column is None:
+            if sort_keys:
+                arrow_table = arrow_table.sort_by(sort_keys)
+            self._write_part(table, arrow_table, table)
+            return
+
+        # One sort by (year*100 + month, sort keys) leaves each partition as a contiguous slice
+        pc = self.pc
+        dates = arrow_table[date_column]
+        month_key = pc.add(pc.multiply(pc.year(dates), 100), pc.month(dates))
+        arrow_table = arrow_table.append_column('_month', month_key)
+        arrow_table = arrow_table.sort_by([('_month', 'ascending')] + sort_keys)
+        month_key = arrow_table['_month'].to_numpy()
+        arrow_table = arrow_table.drop_columns(['_month'])
+
+        entry['partition_column'] = PARQUET_PARTITION_COLUMN
+        bounds = np.concatenate([[0], np.flatnonzero(np.diff(month_key)) + 1, [len(month_key)]])
+        for start, stop in zip(bounds[:-1], bounds[1:]):
+            key = int(month_key[start])
+            directory = os.path.join(table, f'{PARQUET_PARTITION_COLUMN}={key // 100:04d}-{key % 100:02d}')
+            self._write_part(table, arrow_table.slice(start, stop - start), directory)
+
+    def _write_part(self, table, arrow_table, directory):
+        entry = self.manifest[table]
+        os.makedirs(os.path.join(self.output_dir, directory), exist_ok=True)
+        path = os.path.join(directory, f'part-{len(entry["files"]):05d}.parquet')
+        self.pq.write_table(arrow_table, os.path.join(self.output_dir, path), compression=self.compression)
+        entry['files'].append(path)
+        entry['rows'] += arrow_table.num_rows
+
+    def _to_arrow(self, table, df):
+        pa, pc = self.pa, self.pc
+        types = self.types.get(table, {})
+        arrays = []
+        for column in df.columns:
+            values = pa.Array.from_pandas(df[column])
+            target = types.get(column)
+            if target is None:
+                target = self._infer_type(column, values)
+            if pa.types.is_dictionary(target) and not pa.types.is_dictionary(values.type):
+                values = pc.dictionary_encode(values.cast(pa.string()))
+            arrays.append(values.cast(target))
+        return pa.Table.from_arrays(arrays, names=list(df.columns))
+
+    def _infer_type(self, column, values):
+        pa, pc = self.pa, self.pc
+        if not pa.types.is_string(values.type) and not pa.types.is_large_string(values.type):
+            return values.type
+        if column.endswith('_date'):
+            return pa.date32()
+        if pc.count_distinct(values).as_py() <= DICTIONARY_MAX_DISTINCT_RATIO * len(values):
+            return pa.dictionary(pa.int32(), pa.string())
+        return pa.string()
+
+
+def read_parquet_table(output_dir, table):
+    """Read a table written by ParquetSink back into a DataFrame, without the month partition column."""
+    _require_pyarrow()
+    import pyarrow.dataset as ds
+    with open(os.path.join(output_dir, PARQUET_MANIFEST)) as f:
+        files = json.load(f)['tables'][table]['files']
+    if not files:
+        return pd.DataFrame()
+    dataset = ds.dataset([os.path.join(output_dir, path) for path in files], format='parquet')
+    return dataset.to_table().to_pandas(date_as_object=False)
+
+
+def iter_parquet_table(output_dir, table, batch_rows, columns=None, filter=None):
+    """Yield a ParquetSink table as DataFrames of at most batch_rows rows, reading one batch at a time.
+
+    filter is a pyarrow.dataset expression; row groups whose statistics rule it out are skipped unread.
+    """
+    _require_pyarrow()
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    with open(os.path.join(output_dir, PARQUET_MANIFEST)) as f:
+        files = json.load(f)['tables'][table]['files']
+    if not files:
+        return
+    dataset = ds.dataset([os.path.join(output_dir, path) for path in files], format='parquet')
+    if columns is not None:
+        columns = [column for column in dataset.schema.names if column in columns]
+    for batch in dataset.to_batches(columns=columns, filter=filter, batch_size=batch_rows):
+        if batch.num_rows:
+            yield pa.Table.from_batches([batch]).to_pandas(date_as_object=False)
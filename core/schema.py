@@ -0,0 +1,144 @@
+import numpy as np
+import pandas as pd
+
+from config.constants import (
+    ACQUISITION_CHANNELS, ARCHETYPES, BILLING_CYCLES, BILLING_STATUSES, BILLING_TYPES, CUSTOMER_STATUSES,
+    GEOGRAPHIES, INDUSTRIES, PLAN_NAMES, SUBSCRIPTION_STATUSES
+)
+from core.features import masks_from_labels
+
+CENTS_PER_DOLLAR = 100
+DATE = np.dtype('datetime64[s]')
+# Labels without a fixed set (company names) are categoricals over whatever values occur
+OPEN_CATEGORY = 'category'
+
+
+def _fixed_categories(values):
+    return pd.CategoricalDtype(list(values))
+
+
+TABLE_SCHEMAS = {
+    'customers': {
+        'id': np.dtype(np.int32),
+        'company_name': OPEN_CATEGORY,
+        'signup_date': DATE,
+        'plan_tier': _fixed_categories(PLAN_NAMES),
+        'geography': _fixed_categories(GEOGRAPHIES),
+        'industry': _fixed_categories(INDUSTRIES),
+        'acquisition_channel': _fixed_categories(ACQUISITION_CHANNELS),
+        'status': _fixed_categories(CUSTOMER_STATUSES),
+        'archetype': _fixed_categories(ARCHETYPES)
+    },
+    'subscriptions': {
+        'id': np.dtype(np.int64),
+        'customer_id': np.dtype(np.int32),
+        'plan_id': np.dtype(np.int16),
+        'plan_name': _fixed_categories(PLAN_NAMES),
+        'start_date': DATE,
+        'end_date': DATE,
+        'monthly_price': np.dtype(np.int32),
+        'status': _fixed_categories(SUBSCRIPTION_STATUSES),
+        'billing_cycle': _fixed_categories(BILLING_CYCLES)
+    },
+    'usage_events': {
+        'customer_id': np.dtype(np.int32),
+        'date': DATE,
+        'api_calls': np.dtype(np.int32),
+        'data_points_ingested': np.dtype(np.int32),
+        'queries_executed': np.dtype(np.int32),
+        'projects_active': np.dtype(np.int16),
+        'feature_used': np.dtype(np.int16)
+    },
+    'billing_transactions': {
+        'customer_id': np.dtype(np.int32),
+        'transaction_date': DATE,
+        'amount_cents': np.dtype(np.int64),
+        'type': _fixed_categories(BILLING_TYPES),
+        'status': _fixed_categories(BILLING_STATUSES)
+    }
+}
+
+
+def empty_frame(table):
+    return pd.DataFrame({column: pd.Series(dtype=dtype) for column, dtype in TABLE_SCHEMAS[table].items()})
+
+
+def categorical(table, column, values):
+    """Labels as a categorical over the column's fixed categories; a label outside the set raises ValueError."""
+    dtype = TABLE_SCHEMAS[table][column]
+    labels = np.asarray(values, dtype=object)
+    result = pd.Categorical(labels, dtype=dtype)
+    unknown = (result.codes < 0) & pd.notna(labels)
+    if unknown.any():
+        raise ValueError(f"{table}.{column} has values outside {list(dtype.categories)}: "
+                         f"{sorted(set(labels[unknown]))}")
+    return result
+
+
+def categorical_from_codes(table, column, codes, labels):
+    """Codes into labels (e.g. an engine's plan_labels), re-coded onto the column's fixed categories.
+
+    Builds the column without materialising one string per row.
+    """
+    dtype = TABLE_SCHEMAS[table][column]
+    positions = dtype.categories.get_indexer(pd.Index(labels))
+    if (positions < 0).any():
+        raise ValueError(f"{table}.{column} has values outside {list(dtype.categories)}: "
+                         f"{[label for label, position in zip(labels, positions) if position < 0]}")
+    return pd.Categorical.from_codes(positions[np.asarray(codes, dtype=np.int64)], dtype=dtype)
+
+
+def to_cents(dollars):
+    return np.rint(np.asarray(dollars, dtype=np.float64) * CENTS_PER_DOLLAR).astype(np.int64)
+
+
+def conform(table, df):
+    """Cast df to TABLE_SCHEMAS[table]; columns that already have their schema type are left untouched.
+
+    Accepts the loosely typed frames read back from CSV (date strings, plain
+    labels, int64 or float numbers) as well as older outputs that carry a
+    dollar 'amount' instead of 'amount_cents' or comma-joined feature_used
+    strings instead of feature bitmasks. Integers are range-checked
+    before they are narrowed and labels are checked against their fixed
+    category sets, so bad data raises ValueError instead of being wrapped or
+    silently turned into NaN. Tables without a schema are returned unchanged.
+    """
+    schema = TABLE_SCHEMAS.get(table)
+    if schema is None:
+        return df
+    if 'amount_cents' in schema and 'amount_cents' not in df and 'amount' in df:
+        df = df.rename(columns={'amount': 'amount_cents'})
+        df['amount_cents'] = to_cents(df['amount_cents'])
+    if 'feature_used' in schema and 'feature_used' in df and not pd.api.types.is_integer_dtype(df['feature_used']):
+        df = df.assign(feature_used=masks_from_labels(df['feature_used']))
+
+    columns = {}
+    for column, dtype in schema.items():
+        if column not in df or df[column].dtype == dtype:
+            continue
+        values = df[column]
+        if dtype is OPEN_CATEGORY:
+            columns[column] = values.astype(OPEN_CATEGORY)
+        elif isinstance(dtype, pd.CategoricalDtype):
+            if isinstance(values.dtype, pd.CategoricalDtype) and not values.isna().any():
+                # Re-code the categories instead of materialising one label per row
+                columns[column] = categorical_from_codes(table, column, values.cat.codes, values.cat.categories)
+            else:
+                columns[column] = categorical(table, column, values)
+        elif dtype == DATE:
+            columns[column] = pd.to_datetime(values).astype(DATE)
+        else:
+            columns[column] = _narrow_integers(table, column, values, dtype)
+    return df.assign(**columns) if columns else df
+
+
+def _narrow_integers(table, column, values, dtype):
+    values = np.asarray(values)
+    if values.dtype.kind == 'f' and np.isnan(values).any():
+        raise ValueError(f"{table}.{column} has missing values but is typed {dtype}")
+    if len(values):
+        limits = np.iinfo(dtype)
+        if values.min() < limits.min or values.max() > limits.max:
+            raise ValueError(f"{table}.{column} has values outside the {dtype} range "
+                             f"[{limits.min}, {limits.max}]")
+    return values.astype(dtype)
@@ -0,0 +1,78 @@
+import numpy as np
+import pandas as pd
+
+from core.day_offsets import to_dates
+from core.result_sinks import SUBSCRIPTION_COLUMNS
+from core.schema import conform
+
+
+class SubscriptionStore:
+    """Live subscriptions indexed by id and by customer, in creation order.
+
+    Closed subscriptions stay in the store until drain_closed() hands them
+    out, so a streaming run only holds open subscriptions between months.
+    start_date and end_date are integer day offsets while a subscription is
+    in the store; they become dates only on the way out.
+    """
+
+    def __init__(self):
+        self._records = {}
+        self._bounds = {}
+        self._customer_ids = {}
+        self._closed = []
+
+    def __len__(self):
+        return len(self._records)
+
+    def add(self, subscription):
+        subscription_id = subscription['id']
+        self._records[subscription_id] = subscription
+        self._bounds[subscription_id] = (subscription['start_date'], subscription['end_date'])
+        self._customer_ids.setdefault(subscription['customer_id'], []).append(subscription_id)
+        if subscription['end_date'] is not None:
+            self._closed.append(subscription_id)
+
+    def extend(self, subscriptions):
+        for subscription in subscriptions:
+            self.add(subscription)
+
+    def replace(self, subscription):
+        subscription_id = subscription['id']
+        was_open = self._records[subscription_id]['end_date'] is None
+        self._records[subscription_id] = subscription
+        self._bounds[subscription_id] = (subscription['start_date'], subscription['end_date'])
+        if was_open and subscription['end_date'] is not None:
+            self._closed.append(subscription_id)
+
+    def get(self, subscription_id):
+        return self._records.get(subscription_id)
+
+    def current(self, customer_id, day):
+        for subscription_id in reversed(self._customer_ids.get(customer_id, [])):
+            start_day, end_day = self._bounds[subscription_id]
+            if start_day <= day and (end_day is None or end_day > day):
+                return self._records[subscription_id]
+        return None
+
+    def drain_closed(self):
+        """Remove and return subscriptions closed since the last drain."""
+        closed = []
+        for subscription_id in self._closed:
+            subscription = self._records.pop(subscription_id)
+            del self._bounds[subscription_id]
+            customer_ids = self._customer_ids[subscription['customer_id']]
+            customer_ids.remove(subscription_id)
+            if not customer_ids:
+                del self._customer_ids[subscription['customer_id']]
+            closed.append(subscription)
+        self._closed = []
+        return self._export(closed)
+
+    def to_dataframe(self):
+        return self._export(list(self._records.values()))
+
+    def _export(self, subscriptions):
+        df = pd.DataFrame(subscriptions, columns=SUBSCRIPTION_COLUMNS)
+        df['start_date'] = to_dates(df['start_date'].to_numpy(dtype=np.int64))
+        df['end_date'] = to_dates(df['end_date'].fillna(-1).to_numpy(dtype=np.int64))
+        return conform('subscriptions', df)
@@ -1,169 +1,357 @@
+import numpy as np
 import pandas as pd
-import random
-from datetime import datetime, timedelta
-from collections import defaultdict
+from collections import defaultdict, deque
+
+from config.business_rules import PLANS
+from core.checkpoints import save_checkpoint, load_checkpoint
+from core.customer_records import build_customer_records
+from core.day_offsets import DAYS_PER_MONTH, to_day_offsets, to_dates
+from core.event_buffers import (
+    EventBuffer, MONTHLY_USAGE_FIELDS, USAGE_EVENT_FIELDS, BILLING_TRANSACTION_FIELDS, BILLING_TYPES, BILLING_TYPE_CODES,
+    BILLING_STATUSES
+)
+from core.features import feature_mask
+from core.instrumentation import SimulationMetrics, ProgressReporter
+from core.result_sinks import MemorySink
+from core.schema import CENTS_PER_DOLLAR, categorical, categorical_from_codes, conform, to_cents
+from core.subscription_store import SubscriptionStore
+
+WEEKS_PER_MONTH = 4
+LOW_USAGE_THRESHOLD = 0.3
+MAX_FEATURES_PER_EVENT = 3
+WEEKLY_DRAWS = {'variance': 0, 'feature_count': 1, 'first': 2, 'second': 3, 'third': 4}
+WEEKLY_DRAW_STRIDE = 8
+TRIAL_MONTHS = 3
+
+PLAN_FEATURES = {plan['name']: plan['features'] for plan in PLANS}
 
 class TimelineSimulator:
+    INSTRUMENTED_PHASES = {
+        'subscription_lookup': ['_get_customer_current_subscription'],
+        'usage_calculation': ['_evaluate_customer_month'],
+        'weekly_usage': ['_weekly_usage_rows'],
+        'plan_changes': ['_check_plan_changes'],
+        'billing': ['_draw_payment', '_generate_billing_transaction'],
+        'churn': ['_check_churn']
+    }
+    
     def __init__(self, behavior_engine, subscription_generator, config):
         self.behavior_engine = behavior_engine
         self.subscription_generator = subscription_generator
         self.config = config
+        self.random_streams = behavior_engine.random_streams
         self.simulation_months = config.get('SIMULATION_MONTHS', 24)
+        self.checkpoint_path = config.get('CHECKPOINT_PATH')
+        self.checkpoint_interval = config.get('CHECKPOINT_INTERVAL', 1)
         
-        self.all_subscriptions = []
-        self.all_usage_events = []
-        self.all_billing_transactions = []
+        self.plan_names = list(behavior_engine.plans.keys())
+        self.plan_labels = np.array(self.plan_names, dtype=object)
+        self.plan_codes = {name: code for code, name in enumerate(self.plan_names)}
+        self._build_feature_tables()
         
+        self.subscriptions = SubscriptionStore()
+        self.monthly_usage = EventBuffer(MONTHLY_USAGE_FIELDS)
+        self.usage_events = EventBuffer(USAGE_EVENT_FIELDS)
+        self.billing_transactions = EventBuffer(BILLING_TRANSACTION_FIELDS)
+        
+        self.customer_records = {}
         self.customer_states = {}  
-        self.customer_usage_history = defaultdict(list)  
+        self.customer_usage_history = defaultdict(lambda: deque(maxlen=TRIAL_MONTHS))  
         self.customer_payment_failures = defaultdict(int) 
         
+        self.verbose = True
+        self.metrics = SimulationMetrics(enabled=bool(config.get('SIMULATION_METRICS')))
+        self.metrics.instrument(self, self.INSTRUMENTED_PHASES)
+        self.progress = ProgressReporter(self.simulation_months)
+        
     def simulate(self, customers_df):
+        sink = MemorySink()
+        self.simulate_to_sink(customers_df, sink)
+        return self._memory_results(sink)
+    
+    def simulate_to_sink(self, customers_df, sink):
+        """Run the simulation, handing each monthly batch to a ResultSink as soon as it is built."""
+        return self._write_batches(customers_df, self.simulate_iter(customers_df), sink)
+    
+    def resume(self, checkpoint, sink=None):
+        """Finish a checkpointed run, simulating only the months after the checkpoint.
+        
+        checkpoint is a path or a dict from load_checkpoint(). Without a sink the
+        results come back as from simulate(); a run that was writing to a
+        CsvSink or ParquetSink resumes into a sink of the same kind on the same
+        output directory.
+        """
+        return self._resume(checkpoint, sink)
     
+    def extend(self, months, checkpoint=None, sink=None):
+        """Push a run's horizon out by months, starting from its last checkpoint (checkpoint_path by default)."""
+        return self._resume(checkpoint or self.checkpoint_path, sink, months)
+    
+    def simulate_iter(self, customers_df):
+        """Yield one batch per month (see ResultSink), then a final batch with open subscriptions and customers."""
         print(f"Starting simulation for {len(customers_df)} customers over {self.simulation_months} months...")
+        self.metrics.start_run()
         
-        self._initialize_customer_states(customers_df)
+        self.customer_records = build_customer_records(customers_df)
+        signup_days = to_day_offsets(customers_df['signup_date'])
+        self._initialize_customer_states(dict(zip(customers_df['id'], signup_days)))
         
         initial_subscriptions = self.subscription_generator.generate_initial_subscriptions(customers_df)
-        self.all_subscriptions.extend(initial_subscriptions.to_dict('records'))
+        initial_subscriptions['start_date'] = signup_days
+        initial_subscriptions['end_date'] = None
+        self.subscriptions.extend(initial_subscriptions.to_dict('records'))
         
-        for month in range(1, self.simulation_months + 1):
-            print(f"Simulating month {month}/{self.simulation_months}...")
-            self._simulate_month(month, customers_df)
+        yield from self._iter_months(customers_df, 1)
+    
+    def _iter_months(self, customers_df, first_month):
+        for month in range(first_month, self.simulation_months + 1):
+            self.metrics.start_month(month)
+            self._simulate_month(month)
+            self.metrics.end_month(month)
+            if self.verbose:
+                self.progress.month(month, self.metrics.counters['churned'])
+            yield self._drain_batch(month)
         
         print("Updating customer final states...")
-        for customer_id, state in self.customer_states.items():
-            mask = customers_df['id'] == customer_id
-            customers_df.loc[mask, 'status'] = state['status']
-            customers_df.loc[mask, 'plan_tier'] = state['current_plan']
+        self._write_final_states(customers_df)
         
         churned_count = (customers_df['status'] == 'churned').sum()
         print(f"Updated {churned_count} customers to churned status")
+        self.metrics.finish_run()
         
-        results = {
-            'customers': customers_df,
-            'subscriptions': pd.DataFrame(self.all_subscriptions),
-            'usage_events': pd.DataFrame(self.all_usage_events),
-            'billing_transactions': pd.DataFrame(self.all_billing_transactions)
-        }
+        final_batch = self._drain_batch(self.simulation_months, final=True)
+        final_batch['customers'] = customers_df
+        yield final_batch
     
+    def _memory_results(self, sink):
         print("Simulation completed!")
+        results = sink.results()
+        if self.metrics.enabled:
+            results['metrics'] = self.metrics.report(type(self).__name__)
         return results
     
-    def _initialize_customer_states(self, customers_df):
-        for _, customer in customers_df.iterrows():
-            self.customer_states[customer['id']] = {
+    def _write_batches(self, customers_df, batches, sink):
+        """Hand batches to the sink, checkpointing every checkpoint_interval months and after the last month."""
+        try:
+            for batch in batches:
+                sink.write_batch(batch)
+                month = batch['month']
+                due = month % self.checkpoint_interval == 0 or month == self.simulation_months
+                if self.checkpoint_path and due and not batch['final']:
+                    with self.metrics.phase('checkpoint'):
+                        self._write_checkpoint(customers_df, month, sink)
+        finally:
+            sink.close()
+        return customers_df
+    
+    def _write_checkpoint(self, customers_df, month, sink):
+        save_checkpoint(self.checkpoint_path, {
+            'engine': type(self).__name__,
+            'seed': self.random_streams.seed,
+            'month': month,
+            'simulation_months': self.simulation_months,
+            'customers': customers_df,
+            'subscription_id_counter': self.subscription_generator.subscription_id_counter,
+            'counters': dict(self.metrics.counters),
+            'state': self._checkpoint_state(),
+            'sink_type': type(sink).__name__,
+            'sink': sink.checkpoint_state()
+        })
+    
+    def _resume(self, checkpoint, sink=None, extra_months=0):
+        if checkpoint is None:
+            raise ValueError("No checkpoint given and CHECKPOINT_PATH is not configured")
+        if isinstance(checkpoint, str):
+            checkpoint = load_checkpoint(checkpoint)
+        if checkpoint['engine'] != type(self).__name__:
+            raise ValueError(f"Checkpoint was written by {checkpoint['engine']}, not {type(self).__name__}")
+        if checkpoint['seed'] != self.random_streams.seed:
+            raise ValueError(f"Checkpoint was written with seed {checkpoint['seed']}; "
+                             f"build the simulator with RANDOM_SEED={checkpoint['seed']} to resume it")
+        
+        first_month = checkpoint['month'] + 1
+        simulation_months = checkpoint['simulation_months'] + extra_months
+        if first_month > simulation_months:
+            # The checkpointed run already finished; restoring the sink would truncate its final batch
+            print(f"Checkpoint is from a finished {simulation_months}-month run; nothing to resume "
+                  f"(extend it to simulate more months)")
+            return None
+        
+        in_memory = sink is None
+        if in_memory:
+            sink = MemorySink()
+        if checkpoint['sink_type'] != type(sink).__name__:
+            raise ValueError(f"Checkpoint was written through a {checkpoint['sink_type']}; "
+                             f"resume it into the same kind of sink, not a {type(sink).__name__}")
+        sink.restore_state(checkpoint['sink'])
+        
+        customers_df = checkpoint['customers']
+        self.simulation_months = simulation_months
+        self.progress = ProgressReporter(self.simulation_months)
+        self.subscription_generator.subscription_id_counter = checkpoint['subscription_id_counter']
+        
+        print(f"Resuming simulation for {len(customers_df)} customers at month {first_month} "
+              f"of {self.simulation_months}...")
+        self.metrics.start_run()
+        self.metrics.counters.update(checkpoint['counters'])
+        self._restore_state(customers_df, checkpoint['state'])
+        
+        self._write_batches(customers_df, self._iter_months(customers_df, first_month), sink)
+        return self._memory_results(sink) if in_memory else customers_df
+    
+    def _checkpoint_state(self):
+        return {
+            'customer_states': self.customer_states,
+            'usage_history': {cid: list(history) for cid, history in self.customer_usage_history.items()},
+            'payment_failures': dict(self.customer_payment_failures),
+            'subscriptions': self.subscriptions
+        }
+    
+    def _restore_state(self, customers_df, state):
+        self.customer_records = build_customer_records(customers_df)
+        self.customer_states = state['customer_states']
+        self.customer_usage_history = defaultdict(lambda: deque(maxlen=TRIAL_MONTHS))
+        for customer_id, history in state['usage_history'].items():
+            self.customer_usage_history[customer_id].extend(history)
+        self.customer_payment_failures = defaultdict(int, state['payment_failures'])
+        self.subscriptions = state['subscriptions']
+    
+    def _drain_batch(self, month, final=False):
+        batch = {
+            'month': month,
+            'final': final,
+            'subscriptions': self.subscriptions.to_dataframe() if final else self.subscriptions.drain_closed(),
+            'usage_events': self._usage_frame(self.usage_events.drain()),
+            'billing_transactions': self._billing_frame(self.billing_transactions.drain())
+        }
+        return batch
+    
+    def _write_final_states(self, customers_df):
+        final_states = pd.DataFrame(
+            {
+                'status': [state['status'] for state in self.customer_states.values()],
+                'plan_tier': [state['current_plan'] for state in self.customer_states.values()]
+            },
+            index=pd.Index(list(self.customer_states.keys()))
+        ).reindex(customers_df['id'])
+        customers_df['status'] = categorical('customers', 'status', final_states['status'])
+        customers_df['plan_tier'] = categorical('customers', 'plan_tier', final_states['plan_tier'])
+    
+    def _initialize_customer_states(self, signup_days):
+        for customer_id in self.customer_records:
+            self.customer_states[customer_id] = {
                 'status': 'active',
                 'current_plan': 'Basic',
-                'signup_month': self._get_month_from_signup(customer['signup_date']),
+                'signup_month': self._get_month_from_signup(signup_days[customer_id]),
                 'churn_month': None,
                 'last_usage': None,
                 'consecutive_low_usage': 0
             }
     
-    def _simulate_month(self, month, customers_df):
-        simulation_date = datetime(2023, 1, 1) + timedelta(days=month * 30)
+    def _simulate_month(self, month):
+        day = month * DAYS_PER_MONTH
         
         active_customers = [cid for cid, state in self.customer_states.items() 
                           if state['status'] == 'active']
         
         for customer_id in active_customers:
-            customer = customers_df[customers_df['id'] == customer_id].iloc[0]
-            self._simulate_customer_month(customer, month, simulation_date)
+            customer = self.customer_records[customer_id]
+            self._simulate_customer_month(customer, month, day)
+        
+        monthly = self.monthly_usage.drain()
+        self.metrics.count('customer_months', len(monthly['customer_id']))
+        self.metrics.count('usage_events', WEEKS_PER_MONTH * len(monthly['customer_id']))
+        self.usage_events.extend(self._weekly_usage_rows(
+            monthly['customer_id'], month, day, monthly['plan'], monthly['api_calls'],
+            monthly['data_points_ingested'], monthly['queries_executed'], monthly['projects_active']
+        ))
     
-    def _simulate_customer_month(self, customer, month, simulation_date):
+    def _simulate_customer_month(self, customer, month, day):
         customer_id = customer['id']
         state = self.customer_states[customer_id]
         
         if month < state['signup_month']:
             return
         
-        current_sub = self._get_customer_current_subscription(customer_id, simulation_date)
+        current_sub = self._get_customer_current_subscription(customer_id, day)
         if not current_sub:
             return
             
         current_plan = current_sub['plan_name']
+        tenure_month = month - state['signup_month'] + 1
         
-        previous_usage = state['last_usage']
-        usage = self.behavior_engine.calculate_usage(
-            customer, month - state['signup_month'] + 1, current_plan, previous_usage
-        )
+        payment_succeeded = self._draw_payment(customer, month)
+        evaluation = self._evaluate_customer_month(customer, month, tenure_month, current_plan, state)
+        usage = evaluation['usage']
         
-        self._record_usage_event(customer_id, simulation_date, usage, current_plan)
+        self._record_usage_event(customer_id, usage, current_plan)
         
         state['last_usage'] = usage
         self.customer_usage_history[customer_id].append(usage)
         
-        if usage['usage_percentage'] < 0.3:
+        if usage['usage_percentage'] < LOW_USAGE_THRESHOLD:
             state['consecutive_low_usage'] += 1
         else:
             state['consecutive_low_usage'] = 0
         
-        self._check_plan_changes(customer, month, usage, current_sub, simulation_date)
+        self._check_plan_changes(customer, evaluation, current_sub, day)
         
-        self._generate_billing_transaction(customer, current_sub, simulation_date)
+        self._generate_billing_transaction(customer, current_sub, day, payment_succeeded)
         
-        self._check_churn(customer, month, simulation_date)
+        self._check_churn(customer, month, tenure_month, evaluation['churn_probability'], day)
+    
+    def _evaluate_customer_month(self, customer, month, tenure_month, current_plan, state):
+        customer_id = customer['id']
+        return self.behavior_engine.evaluate_month(
+            customer, month, tenure_month, current_plan, state['last_usage'],
+            self.customer_usage_history[customer_id], self.customer_payment_failures[customer_id]
+        )
     
-    def _check_plan_changes(self, customer, month, usage, current_subscription, simulation_date):
+    def _check_plan_changes(self, customer, evaluation, current_subscription, day):
         customer_id = customer['id']
         current_plan = current_subscription['plan_name']
         
-        should_upgrade, target_plan = self.behavior_engine.should_upgrade(
-            customer, usage, current_plan, month
-        )
+        should_upgrade, target_plan = evaluation['upgrade']
         
         if should_upgrade and target_plan != current_plan:
             self._execute_plan_change(customer_id, current_subscription, target_plan, 
-                                    simulation_date, 'upgrade')
+                                    day, 'upgrade')
             return
         
-        should_downgrade, target_plan = self.behavior_engine.should_downgrade(
-            customer, usage, current_plan, month
-        )
+        should_downgrade, target_plan = evaluation['downgrade']
         
         if should_downgrade and target_plan != current_plan:
             self._execute_plan_change(customer_id, current_subscription, target_plan, 
-                                    simulation_date, 'downgrade')
+                                    day, 'downgrade')
     
-    def _check_churn(self, customer, month, simulation_date):
+    def _check_churn(self, customer, month, tenure_months, churn_probability, day):
         customer_id = customer['id']
         state = self.customer_states[customer_id]
         
-        usage_history = self.customer_usage_history[customer_id]
-        payment_failures = self.customer_payment_failures[customer_id]
-        
-        churn_probability = self.behavior_engine.calculate_churn_risk(
-            customer, month - state['signup_month'] + 1, usage_history, payment_failures
-        )
-        
         if customer['archetype'] == 'failed_adoption':
             if state['consecutive_low_usage'] >= 2:
                 churn_probability = min(churn_probability * 2, 0.8)
         
         elif customer['archetype'] == 'enterprise_pilot':
-            tenure_months = month - state['signup_month'] + 1
             if tenure_months <= 3:
+                usage_history = self.customer_usage_history[customer_id]
                 avg_usage = sum(u['usage_percentage'] for u in usage_history) / len(usage_history)
                 if avg_usage < 0.4:  
                     churn_probability = 0.4  
                 else:
                     churn_probability = 0.05  
         
-        if random.random() < churn_probability:
-            self._execute_churn(customer_id, simulation_date)
+        if self.random_streams.random('churn', customer_id, month) < churn_probability:
+            self._execute_churn(customer_id, day)
     
-    def _execute_plan_change(self, customer_id, current_subscription, new_plan, date, change_type):
+    def _execute_plan_change(self, customer_id, current_subscription, new_plan, day, change_type):
         ended_sub, new_sub = self.subscription_generator.create_plan_change(
-            customer_id, current_subscription, new_plan, date.strftime('%Y-%m-%d'), change_type
+            customer_id, current_subscription, new_plan, day, change_type
         )
         
-        for i, sub in enumerate(self.all_subscriptions):
-            if sub['id'] == current_subscription['id']:
-                self.all_subscriptions[i] = ended_sub
-                break
-        
-        self.all_subscriptions.append(new_sub)
+        self.subscriptions.replace(ended_sub)
+        self.subscriptions.add(new_sub)
+        self.metrics.count(f'{change_type}s')
         
         self.customer_states[customer_id]['current_plan'] = new_plan
         
@@ -173,108 +361,146 @@ class TimelineSimulator:
         
         if price_difference > 0:  
             self._record_billing_transaction(
-                customer_id, date, price_difference, 'upgrade', 'success'
+                customer_id, day, price_difference, 'upgrade', 'success'
             )
         elif price_difference < 0:  
             self._record_billing_transaction(
-                customer_id, date, abs(price_difference), 'refund', 'success'
+                customer_id, day, abs(price_difference), 'refund', 'success'
             )
     
-    def _execute_churn(self, customer_id, churn_date):
+    def _execute_churn(self, customer_id, churn_day):
         state = self.customer_states[customer_id]
         state['status'] = 'churned'
-        state['churn_month'] = churn_date
+        state['churn_month'] = churn_day
         
-        current_sub = self._get_customer_current_subscription(customer_id, churn_date)
+        current_sub = self._get_customer_current_subscription(customer_id, churn_day)
         if current_sub:
-            cancelled_sub = self.subscription_generator.cancel_subscription(
-                current_sub, churn_date.strftime('%Y-%m-%d')
-            )
-            
-            for i, sub in enumerate(self.all_subscriptions):
-                if sub['id'] == current_sub['id']:
-                    self.all_subscriptions[i] = cancelled_sub
-                    break
+            cancelled_sub = self.subscription_generator.cancel_subscription(current_sub, churn_day)
+            self.subscriptions.replace(cancelled_sub)
         
-        print(f"Customer {customer_id} churned in month {churn_date.strftime('%Y-%m')}")
+        self.metrics.count('churned')
     
-    def _generate_billing_transaction(self, customer, subscription, date):
+    def _draw_payment(self, customer, month):
         customer_id = customer['id']
         
         payment_success_rate = self._get_payment_success_rate(customer)
-        payment_succeeded = random.random() < payment_success_rate
+        payment_succeeded = self.random_streams.random('billing', customer_id, month) < payment_success_rate
         
         if payment_succeeded:
             self.customer_payment_failures[customer_id] = 0  
-            status = 'success'
         else:
             self.customer_payment_failures[customer_id] += 1
-            status = 'failed'
+        
+        return payment_succeeded
+    
+    def _generate_billing_transaction(self, customer, subscription, day, payment_succeeded):
+        status = 'success' if payment_succeeded else 'failed'
         
         self._record_billing_transaction(
-            customer_id, date, subscription['monthly_price'], 'subscription', status
+            customer['id'], day, subscription['monthly_price'], 'subscription', status
         )
     
-    def _record_usage_event(self, customer_id, date, usage, plan_name):
-        available_features = self._get_plan_features(plan_name)
-        
-        weeks_in_month = 4
-        monthly_api_calls = usage['api_calls']
-        monthly_data_points = usage['data_points_ingested']
-        monthly_queries = usage['queries_executed']
-        
-        for week in range(weeks_in_month):
-            week_date = date + timedelta(days=week * 7)
-            
+    def _record_usage_event(self, customer_id, usage, plan_name):
+        """Stage monthly usage; _simulate_month expands all staged customers into weekly rows in one pass."""
+        self.monthly_usage.append((
+            customer_id,
+            self.plan_codes[plan_name],
+            usage['api_calls'],
+            usage['data_points_ingested'],
+            usage['queries_executed'],
+            usage['projects_active']
+        ))
+    
+    def _weekly_usage_rows(self, customer_ids, month, day, plan, api_calls, data_points, queries, projects):
+        """Split a month of usage into weekly rows for many customers at once.
 
-            base_weekly_pct = 0.25  
-            variance = random.uniform(-0.05, 0.05)  
-            weekly_pct = base_weekly_pct + variance
-            
-            features_used = random.sample(available_features, 
-                                        random.randint(1, min(3, len(available_features))))
-            
-            usage_event = {
-                'customer_id': customer_id,
-                'date': week_date.strftime('%Y-%m-%d'),
-                'api_calls': int(monthly_api_calls * weekly_pct),
-                'data_points_ingested': int(monthly_data_points * weekly_pct),
-                'queries_executed': int(monthly_queries * weekly_pct),
-                'projects_active': usage['projects_active'],
-                'feature_used': ','.join(features_used)
-            }
-            
-            self.all_usage_events.append(usage_event)
+        Each week takes a 25% +/- 5% share of the monthly totals and a sample
+        of 1-3 of the plan's features, stored as a FEATURE_BITS bitmask.
+        """
+        n = len(customer_ids)
+        streams = self.random_streams
+        ids = customer_ids[:, None]
+        week_slots = np.arange(WEEKS_PER_MONTH)[None, :] * WEEKLY_DRAW_STRIDE
     
-    def _record_billing_transaction(self, customer_id, date, amount, transaction_type, status):
-        """Record a billing transaction."""
-        transaction = {
-            'customer_id': customer_id,
-            'transaction_date': date.strftime('%Y-%m-%d'),
-            'amount': amount,
-            'type': transaction_type,
-            'status': status
+        def draw(name):
+            return streams.random_array('weekly_usage', ids, month, week_slots + WEEKLY_DRAWS[name])
+    
+        weekly_pct = 0.25 + streams.uniform_array(
+            'weekly_usage', ids, month, week_slots + WEEKLY_DRAWS['variance'], -0.05, 0.05
+        )
+    
+        n_features = self.plan_feature_count[plan][:, None]
+        n_picks = 1 + np.floor(draw('feature_count') * np.minimum(MAX_FEATURES_PER_EVENT, n_features)).astype(np.int64)
+        first = np.floor(draw('first') * n_features).astype(np.int64)
+        second = np.floor(draw('second') * (n_features - 1)).astype(np.int64)
+        second += second >= first
+        third = np.floor(draw('third') * (n_features - 2)).astype(np.int64)
+        low, high = np.minimum(first, second), np.maximum(first, second)
+        third += third >= low
+        third += third >= high
+        plan_bits = self.plan_feature_bits[plan]
+        last_pick = plan_bits.shape[1] - 1
+    
+        def bit(pick):
+            # Unused picks can fall outside the plan's features; clip them to a valid column before masking
+            return np.take_along_axis(plan_bits, np.clip(pick, 0, last_pick), axis=1)
+    
+        features = bit(first) | np.where(n_picks >= 2, bit(second), 0) | np.where(n_picks >= 3, bit(third), 0)
+    
+        return {
+            'customer_id': np.repeat(customer_ids, WEEKS_PER_MONTH),
+            'day': (day + 7 * np.arange(WEEKS_PER_MONTH)[None, :]).repeat(n, axis=0).ravel(),
+            'api_calls': np.trunc(api_calls[:, None] * weekly_pct).astype(np.int64).ravel(),
+            'data_points_ingested': np.trunc(data_points[:, None] * weekly_pct).astype(np.int64).ravel(),
+            'queries_executed': np.trunc(queries[:, None] * weekly_pct).astype(np.int64).ravel(),
+            'projects_active': np.repeat(projects, WEEKS_PER_MONTH),
+            'feature_mask': features.ravel()
         }
-        
-        self.all_billing_transactions.append(transaction)
     
-    def _get_customer_current_subscription(self, customer_id, date):
-        """Get customer's active subscription on a specific date."""
-        customer_subs = [sub for sub in self.all_subscriptions 
-                        if sub['customer_id'] == customer_id]
-        
-        for sub in reversed(customer_subs):  
-            start_date = datetime.strptime(sub['start_date'], '%Y-%m-%d')
-            
-            if start_date <= date:
-                if sub['end_date'] is None:  
-                    return sub
-                else:
-                    end_date = datetime.strptime(sub['end_date'], '%Y-%m-%d')
-                    if end_date > date:  
-                        return sub
-        
-        return None
+    def _record_billing_transaction(self, customer_id, day, amount, transaction_type, status):
+        """Record a billing transaction."""
+        self.metrics.count('billing_transactions')
+        self.billing_transactions.append((
+            customer_id,
+            day,
+            amount,
+            BILLING_TYPE_CODES[transaction_type],
+            status == 'success'
+        ))
+    
+    def _build_feature_tables(self):
+        """plan_feature_bits[plan, i] is the FEATURE_BITS flag of the plan's i-th feature (0 past its last one)."""
+        plan_features = [self._get_plan_features(p) for p in self.plan_names]
+        self.plan_feature_count = np.array([len(f) for f in plan_features], dtype=np.int64)
+        self.plan_feature_bits = np.zeros((len(plan_features), self.plan_feature_count.max()), dtype=np.int64)
+        for p, features in enumerate(plan_features):
+            self.plan_feature_bits[p, :len(features)] = [feature_mask([feature]) for feature in features]
+    
+    def _usage_frame(self, usage):
+        return conform('usage_events', pd.DataFrame({
+            'customer_id': usage['customer_id'],
+            'date': to_dates(usage['day']),
+            'api_calls': usage['api_calls'],
+            'data_points_ingested': usage['data_points_ingested'],
+            'queries_executed': usage['queries_executed'],
+            'projects_active': usage['projects_active'],
+            'feature_used': usage['feature_mask']
+        }, copy=False))
+    
+    def _billing_frame(self, billing):
+        return conform('billing_transactions', pd.DataFrame({
+            'customer_id': billing['customer_id'],
+            'transaction_date': to_dates(billing['day']),
+            'amount_cents': to_cents(billing['amount']),
+            'type': categorical_from_codes('billing_transactions', 'type', billing['type'], BILLING_TYPES),
+            'status': categorical_from_codes(
+                'billing_transactions', 'status', billing['success'].astype(np.int64), BILLING_STATUSES
+            )
+        }, copy=False))
+    
+    def _get_customer_current_subscription(self, customer_id, day):
+        """Get customer's active subscription on a specific simulation day."""
+        return self.subscriptions.current(customer_id, day)
     
     def _get_payment_success_rate(self, customer):
         """Get payment success rate based on customer characteristics."""
@@ -292,19 +518,10 @@ class TimelineSimulator:
         return min(base_rate, 0.99)  
     
     def _get_plan_features(self, plan_name):
-        plan_features = {
-            'Basic': ['basic_analytics', 'dashboard', 'api_access'],
-            'Pro': ['basic_analytics', 'dashboard', 'api_access', 'advanced_analytics', 'custom_reports'],
-            'Enterprise': ['basic_analytics', 'dashboard', 'api_access', 'advanced_analytics', 
-                         'custom_reports', 'white_label', 'priority_support']
-        }
-        return plan_features.get(plan_name, ['basic_analytics'])
+        return PLAN_FEATURES.get(plan_name, ['basic_analytics'])
     
-    def _get_month_from_signup(self, signup_date_str):
-        signup_date = datetime.strptime(signup_date_str, '%Y-%m-%d')
-        simulation_start = datetime(2023, 1, 1)
-        days_diff = (signup_date - simulation_start).days
-        return max(1, days_diff // 30 + 1)
+    def _get_month_from_signup(self, signup_day):
+        return max(1, int(signup_day) // DAYS_PER_MONTH + 1)
     
     def get_simulation_summary(self, results):
         customers_df = results['customers']
@@ -313,11 +530,11 @@ class TimelineSimulator:
         billing_df = results['billing_transactions']
         
         total_customers = len(customers_df)
-        churned_customers = len([s for s in self.customer_states.values() if s['status'] == 'churned'])
+        churned_customers = int((customers_df['status'] == 'churned').sum())
         retention_rate = (total_customers - churned_customers) / total_customers * 100
         
         successful_transactions = billing_df[billing_df['status'] == 'success']
-        total_revenue = successful_transactions['amount'].sum()
+        total_revenue = successful_transactions['amount_cents'].sum() / CENTS_PER_DOLLAR
         
         active_subscriptions = subscriptions_df[subscriptions_df['status'] == 'active']
         plan_distribution = active_subscriptions['plan_name'].value_counts()
@@ -0,0 +1,440 @@
+import numpy as np
+import pandas as pd
+
+from core.behavior_engine import DOWNGRADE_USAGE_THRESHOLD, USAGE_DRAWS
+from core.event_buffers import USAGE_EVENT_FIELDS, BILLING_TRANSACTION_FIELDS
+from core.day_offsets import DAYS_PER_MONTH, to_day_offsets, to_dates
+from core.schema import categorical_from_codes, conform
+from core.timeline_simulator import TimelineSimulator, LOW_USAGE_THRESHOLD, WEEKS_PER_MONTH
+
+MAX_PAYMENT_FAILURES = 2
+
+SUBSCRIPTION_STATUSES = ['active', 'cancelled']
+CUSTOMER_STATUSES = ['active', 'churned']
+SUBSCRIPTION_ARRAYS = ('sub_id', 'sub_customer', 'sub_plan', 'sub_start', 'sub_end')
+CUSTOMER_STATE_ARRAYS = (
+    'signup_month', 'active', 'plan', 'has_usage', 'payment_failures', 'low_usage_streak',
+    'usage_pct_sum', 'usage_months', 'current_sub'
+)
+
+
+class VectorizedTimelineSimulator(TimelineSimulator):
+    """Columnar engine: advances every active customer for a month in a few array operations."""
+
+    INSTRUMENTED_PHASES = {
+        'month_step': ['_simulate_month_arrays'],
+        'weekly_usage': ['_weekly_usage_rows'],
+        'subscription_changes': ['_close_subscriptions', '_open_subscriptions'],
+        'subscription_drain': ['_drain_closed_subscriptions']
+    }
+
+    def __init__(self, behavior_engine, subscription_generator, config):
+        super().__init__(behavior_engine, subscription_generator, config)
+        self.segment_tables = None
+
+        self.plan_api_limit = np.array([behavior_engine.plans[p]['api_call_limit'] for p in self.plan_names], dtype=np.int64)
+        self.plan_max_projects = np.array([behavior_engine.plans[p]['max_projects'] for p in self.plan_names], dtype=np.int64)
+        self.plan_price = np.array([subscription_generator._get_plan_price(p) for p in self.plan_names], dtype=np.int64)
+        self.plan_ids = np.array([subscription_generator._get_plan_id(p) for p in self.plan_names], dtype=np.int64)
+
+    def simulate(self, customers_df):
+        if self.checkpoint_path:
+            return super().simulate(customers_df)
+        self._log(f"Starting vectorized simulation for {len(customers_df)} customers over {self.simulation_months} months...")
+
+        columns = self.encode_customers(customers_df)
+        self.segment_tables = self.compile_segments(columns['segments'])
+        raw = self.run_columns(columns)
+
+        self._log("Updating customer final states...")
+        results = self.export_results(customers_df, columns['ids'], raw)
+
+        churned_count = (customers_df['status'] == 'churned').sum()
+        self._log(f"Updated {churned_count} customers to churned status")
+        self._log("Simulation completed!")
+        if self.metrics.enabled:
+            results['metrics'] = self.metrics.report(type(self).__name__)
+        return results
+
+    def simulate_iter(self, customers_df):
+        """Streaming counterpart of simulate(); yields the batches described in ResultSink."""
+        self._log(f"Starting vectorized simulation for {len(customers_df)} customers over {self.simulation_months} months...")
+
+        columns = self.encode_customers(customers_df)
+        self.segment_tables = self.compile_segments(columns['segments'])
+        yield from self._export_batches(customers_df, columns['ids'], self.iter_columns(columns))
+
+    def _iter_months(self, customers_df, first_month):
+        return self._export_batches(customers_df, self.customer_ids, self._iter_month_arrays(first_month))
+
+    def _export_batches(self, customers_df, customer_ids, raw_batches):
+        for raw in raw_batches:
+            batch = {
+                'month': raw['month'],
+                'final': raw['final'],
+                'subscriptions': self._export_subscriptions(customer_ids, raw['subscriptions']),
+                'usage_events': self._usage_frame(raw['usage_events']),
+                'billing_transactions': self._billing_frame(raw['billing_transactions'])
+            }
+            if raw['final']:
+                self._log("Updating customer final states...")
+                self._export_customer_states(customers_df, raw)
+                batch['customers'] = customers_df
+            yield batch
+
+    def encode_customers(self, customers_df):
+        """Integer-coded customer columns: ids, signup day offsets and (archetype, geography, industry) segments."""
+        signup_days = to_day_offsets(customers_df['signup_date'])
+
+        segments = pd.MultiIndex.from_arrays([
+            customers_df['archetype'], customers_df['geography'], customers_df['industry']
+        ])
+        segment_codes, segment_values = segments.factorize()
+
+        return {
+            'ids': customers_df['id'].to_numpy(dtype=np.int64),
+            'signup_day': signup_days,
+            'segment': segment_codes.astype(np.int64),
+            'segments': [
+                {'archetype': archetype, 'geography': geography, 'industry': industry}
+                for archetype, geography, industry in segment_values
+            ]
+        }
+
+    def compile_segments(self, segment_customers):
+        """Resolve every behavior parameter the monthly step needs, per segment and month."""
+        engine = self.behavior_engine
+        months = self.simulation_months + 1
+        n_segments = len(segment_customers)
+        n_plans = len(self.plan_names)
+
+        tables = {
+            'is_failed_adoption': np.array([c['archetype'] == 'failed_adoption' for c in segment_customers], dtype=bool),
+            'is_enterprise_pilot': np.array([c['archetype'] == 'enterprise_pilot' for c in segment_customers], dtype=bool),
+            'random_base': np.array(
+                [c['archetype'] not in ('failed_adoption', 'price_sensitive') for c in segment_customers], dtype=bool
+            ),
+            'payment_rate': np.array([self._get_payment_success_rate(c) for c in segment_customers], dtype=np.float64),
+            'fixed_base': np.zeros((n_segments, months)),
+            'growth_rate': np.zeros((n_segments, months)),
+            'growth_variance': np.zeros((n_segments, months)),
+            'seasonal_mult': np.ones((n_segments, months)),
+            'industry_mult': np.ones((n_segments, months)),
+            'upgrade_threshold': np.zeros((n_segments, months)),
+            'churn': np.zeros((n_segments, months, MAX_PAYMENT_FAILURES + 1)),
+            'upgrade_target': np.zeros((n_segments, n_plans), dtype=np.int64),
+            'downgrade_target': np.zeros((n_segments, months, n_plans), dtype=np.int64)
+        }
+
+        for s, customer in enumerate(segment_customers):
+            for p, plan_name in enumerate(self.plan_names):
+                tables['upgrade_target'][s, p] = self.plan_codes[engine._get_target_upgrade_plan(plan_name, customer)]
+
+            for m in range(1, months):
+                behavior = engine.get_monthly_behavior(customer, m)
+                if not tables['random_base'][s]:
+                    tables['fixed_base'][s, m] = engine._get_base_usage_percentage(customer, behavior, m)
+                tables['growth_rate'][s, m] = behavior.get('monthly_growth_rate', 0)
+                tables['growth_variance'][s, m] = behavior.get('growth_variance', 0.05)
+                tables['seasonal_mult'][s, m] = engine._get_seasonal_multiplier(customer, behavior, m)
+                tables['industry_mult'][s, m] = engine._get_industry_usage_multiplier(customer, m)
+                tables['upgrade_threshold'][s, m] = engine.get_upgrade_threshold(customer, m)
+                for failures in range(MAX_PAYMENT_FAILURES + 1):
+                    tables['churn'][s, m, failures] = engine.calculate_churn_risk(customer, m, [], failures)
+                for p, plan_name in enumerate(self.plan_names):
+                    _, target = engine.should_downgrade(customer, {'usage_percentage': 0.0}, plan_name, m)
+                    tables['downgrade_target'][s, m, p] = self.plan_codes[target]
+
+        return tables
+
+    def run_columns(self, columns, new_subscription_id=None):
+        """Simulate encoded customers; returns raw columnar state and event arrays keyed by customer position."""
+        subscription_batches = []
+        for batch in self.iter_columns(columns, new_subscription_id):
+            subscription_batches.append(batch['subscriptions'])
+            self.usage_events.extend(batch['usage_events'])
+            self.billing_transactions.extend(batch['billing_transactions'])
+
+        subscriptions = {
+            key: np.concatenate([rows[key] for rows in subscription_batches])
+            for key in subscription_batches[-1]
+        }
+        order = subscriptions['id'].argsort(kind='stable')
+        return {
+            'active': batch['active'],
+            'plan': batch['plan'],
+            'subscriptions': {key: values[order] for key, values in subscriptions.items()},
+            'usage_events': self.usage_events.drain(),
+            'billing_transactions': self.billing_transactions.drain()
+        }
+
+    def iter_columns(self, columns, new_subscription_id=None):
+        """Yield raw monthly batches; closed subscriptions are handed out and dropped as they close."""
+        self._initialize_arrays(columns['ids'], columns['signup_day'], columns['segment'])
+        if new_subscription_id is not None:
+            self.subscription_generator.subscription_id_counter = new_subscription_id
+        self.metrics.start_run()
+        yield from self._iter_month_arrays(1)
+
+    def _iter_month_arrays(self, first_month):
+        for month in range(first_month, self.simulation_months + 1):
+            self.metrics.start_month(month)
+            usage, billing = self._simulate_month_arrays(month)
+            closed = self._drain_closed_subscriptions()
+            self.metrics.end_month(month)
+            if self.verbose:
+                self.progress.month(month, self.metrics.counters['churned'])
+            yield {
+                'month': month,
+                'final': False,
+                'subscriptions': closed,
+                'usage_events': usage,
+                'billing_transactions': billing
+            }
+
+        self.metrics.finish_run()
+        yield {
+            'month': self.simulation_months,
+            'final': True,
+            'active': self.active,
+            'plan': self.plan,
+            'subscriptions': self._subscription_rows(np.arange(self._sub_count)),
+            # Built from the field specs: a resumed run with no months left never runs the loop above
+            'usage_events': {key: np.empty(0, dtype=dtype) for key, dtype in USAGE_EVENT_FIELDS.items()},
+            'billing_transactions': {key: np.empty(0, dtype=dtype) for key, dtype in BILLING_TRANSACTION_FIELDS.items()}
+        }
+
+    def export_results(self, customers_df, customer_ids, raw):
+        self._export_customer_states(customers_df, raw)
+
+        return {
+            'customers': customers_df,
+            'subscriptions': self._export_subscriptions(customer_ids, raw['subscriptions']),
+            'usage_events': self._usage_frame(raw['usage_events']),
+            'billing_transactions': self._billing_frame(raw['billing_transactions'])
+        }
+
+    def _export_customer_states(self, customers_df, raw):
+        customers_df['status'] = categorical_from_codes('customers', 'status', ~raw['active'], CUSTOMER_STATUSES)
+        customers_df['plan_tier'] = categorical_from_codes('customers', 'plan_tier', raw['plan'], self.plan_labels)
+
+    def _log(self, message):
+        if self.verbose:
+            print(message)
+
+    def _initialize_arrays(self, customer_ids, signup_days, segment):
+        n = len(signup_days)
+        self.customer_ids = customer_ids
+        self.signup_month = np.maximum(1, signup_days // DAYS_PER_MONTH + 1)
+        self.segment = segment
+
+        self.active = np.ones(n, dtype=bool)
+        self.plan = np.full(n, self.plan_codes['Basic'], dtype=np.int64)
+        self.has_usage = np.zeros(n, dtype=bool)
+        self.payment_failures = np.zeros(n, dtype=np.int64)
+        self.low_usage_streak = np.zeros(n, dtype=np.int64)
+        self.usage_pct_sum = np.zeros(n, dtype=np.float64)
+        self.usage_months = np.zeros(n, dtype=np.int64)
+
+        first_id = self.subscription_generator.subscription_id_counter
+        self.subscription_generator.subscription_id_counter += n
+        self._sub_count = n
+        capacity = max(16, 2 * n)
+        self.sub_id = np.zeros(capacity, dtype=np.int64)
+        self.sub_customer = np.zeros(capacity, dtype=np.int64)
+        self.sub_plan = np.zeros(capacity, dtype=np.int64)
+        self.sub_start = np.zeros(capacity, dtype=np.int64)
+        self.sub_end = np.full(capacity, -1, dtype=np.int64)
+        self.sub_id[:n] = np.arange(first_id, first_id + n)
+        self.sub_customer[:n] = np.arange(n)
+        self.sub_plan[:n] = self.plan_codes['Basic']
+        self.sub_start[:n] = signup_days
+        self.current_sub = np.arange(n, dtype=np.int64)
+
+    def _checkpoint_state(self):
+        state = {name: getattr(self, name) for name in CUSTOMER_STATE_ARRAYS}
+        for name in SUBSCRIPTION_ARRAYS:
+            state[name] = getattr(self, name)[:self._sub_count]
+        return state
+
+    def _restore_state(self, customers_df, state):
+        """Reload the arrays and recompile the segment tables, which are sized for the (possibly longer) horizon."""
+        columns = self.encode_customers(customers_df)
+        self.segment_tables = self.compile_segments(columns['segments'])
+        self.customer_ids = columns['ids']
+        self.segment = columns['segment']
+        for name in CUSTOMER_STATE_ARRAYS:
+            setattr(self, name, state[name].copy())
+        for name in SUBSCRIPTION_ARRAYS:
+            setattr(self, name, state[name].copy())
+        self._sub_count = len(self.sub_id)
+        self._ensure_subscription_capacity(max(16, 2 * len(self.customer_ids)))
+
+    def _simulate_month_arrays(self, month):
+        day = month * DAYS_PER_MONTH
+        streams = self.random_streams
+        tables = self.segment_tables
+
+        idx = np.flatnonzero(self.active & (self.signup_month <= month))
+        n = len(idx)
+        ids = self.customer_ids[idx]
+        seg = self.segment[idx]
+        tenure = month - self.signup_month[idx] + 1
+        plan = self.plan[idx]
+
+        base_usage = np.where(
+            tables['random_base'][seg],
+            streams.uniform_array('usage', ids, tenure, USAGE_DRAWS['base'], 0.4, 0.7),
+            tables['fixed_base'][seg, tenure]
+        )
+        growth_variance = tables['growth_variance'][seg, tenure]
+        growth = tables['growth_rate'][seg, tenure] + streams.uniform_array(
+            'usage', ids, tenure, USAGE_DRAWS['growth'], -growth_variance, growth_variance
+        )
+        base_usage = np.where(self.has_usage[idx], base_usage * (1 + growth), base_usage)
+        base_usage = base_usage * tables['seasonal_mult'][seg, tenure]
+        base_usage = base_usage * tables['industry_mult'][seg, tenure]
+
+        api_calls = np.trunc(self.plan_api_limit[plan] * base_usage).astype(np.int64)
+        data_points = np.trunc(
+            api_calls * streams.uniform_array('usage', ids, tenure, USAGE_DRAWS['data_points'], 1.5, 3.0)
+        ).astype(np.int64)
+        queries = np.trunc(api_calls * 0.1).astype(np.int64)
+        projects = np.minimum(
+            streams.randint_array('usage', ids, tenure, USAGE_DRAWS['projects'], 1, 3), self.plan_max_projects[plan]
+        )
+        usage_pct = np.minimum(base_usage, 1.5)
+        api_calls = np.maximum(api_calls, 0)
+        data_points = np.maximum(data_points, 0)
+        queries = np.maximum(queries, 0)
+
+        usage = self._weekly_usage_rows(ids, month, day, plan, api_calls, data_points, queries, projects)
+
+        self.has_usage[idx] = True
+        self.usage_pct_sum[idx] += usage_pct
+        self.usage_months[idx] += 1
+        low = usage_pct < LOW_USAGE_THRESHOLD
+        self.low_usage_streak[idx] = np.where(low, self.low_usage_streak[idx] + 1, 0)
+
+        upgrade_target = tables['upgrade_target'][seg, plan]
+        upgrade = (usage_pct >= tables['upgrade_threshold'][seg, month]) & (upgrade_target != plan)
+        downgrade_target = tables['downgrade_target'][seg, month, plan]
+        downgrade = ~upgrade & (usage_pct < DOWNGRADE_USAGE_THRESHOLD) & (downgrade_target != plan)
+        new_plan = np.where(upgrade, upgrade_target, np.where(downgrade, downgrade_target, plan))
+        changed = new_plan != plan
+
+        change_pos = np.flatnonzero(changed)
+        change_customers = idx[change_pos]
+        self._close_subscriptions(change_customers, day)
+        self._open_subscriptions(change_customers, new_plan[change_pos], day)
+        self.plan[change_customers] = new_plan[change_pos]
+
+        price_difference = self.plan_price[new_plan[change_pos]] - self.plan_price[plan[change_pos]]
+        change_type = np.where(price_difference > 0, 1, 2)
+
+        payment_ok = streams.random_array('billing', ids, month) < tables['payment_rate'][seg]
+        self.payment_failures[idx] = np.where(payment_ok, 0, self.payment_failures[idx] + 1)
+
+        failures = np.minimum(self.payment_failures[idx], MAX_PAYMENT_FAILURES)
+        churn_probability = tables['churn'][seg, tenure, failures]
+        failed_adoption = tables['is_failed_adoption'][seg] & (self.low_usage_streak[idx] >= 2)
+        churn_probability = np.where(failed_adoption, np.minimum(churn_probability * 2, 0.8), churn_probability)
+        pilot_trial = tables['is_enterprise_pilot'][seg] & (tenure <= 3)
+        avg_usage = self.usage_pct_sum[idx] / self.usage_months[idx]
+        churn_probability = np.where(pilot_trial, np.where(avg_usage < 0.4, 0.4, 0.05), churn_probability)
+
+        churned = idx[streams.random_array('churn', ids, month) < churn_probability]
+        self.active[churned] = False
+        self._close_subscriptions(churned, day)
+
+        metrics = self.metrics
+        metrics.count('customer_months', n)
+        metrics.count('usage_events', WEEKS_PER_MONTH * n)
+        metrics.count('billing_transactions', n + len(change_pos))
+        metrics.count('upgrades', int(upgrade.sum()))
+        metrics.count('downgrades', int(downgrade.sum()))
+        metrics.count('churned', len(churned))
+
+        billing_customers = np.concatenate([change_customers, idx])
+        billing_order = billing_customers.argsort(kind='stable')
+        billing = {
+            'customer_id': self.customer_ids[billing_customers[billing_order]],
+            'day': np.full(len(billing_order), day, dtype=np.int64),
+            'amount': np.concatenate([np.abs(price_difference), self.plan_price[plan]])[billing_order],
+            'type': np.concatenate([change_type, np.zeros(n, dtype=np.int64)])[billing_order],
+            'success': np.concatenate([np.ones(len(change_pos), dtype=bool), payment_ok])[billing_order]
+        }
+        return usage, billing
+
+    def _close_subscriptions(self, customers, day):
+        self.sub_end[self.current_sub[customers]] = day
+
+    def _open_subscriptions(self, customers, plans, day):
+        count = len(customers)
+        if count == 0:
+            return
+        self._ensure_subscription_capacity(self._sub_count + count)
+
+        first_id = self.subscription_generator.subscription_id_counter
+        self.subscription_generator.subscription_id_counter += count
+        rows = np.arange(self._sub_count, self._sub_count + count)
+        self.sub_id[rows] = np.arange(first_id, first_id + count)
+        self.sub_customer[rows] = customers
+        self.sub_plan[rows] = plans
+        self.sub_start[rows] = day
+        self.current_sub[customers] = rows
+        self._sub_count += count
+
+    def _subscription_rows(self, rows):
+        return {
+            'id': self.sub_id[rows],
+            'customer': self.sub_customer[rows],
+            'plan': self.sub_plan[rows],
+            'start_day': self.sub_start[rows],
+            'end_day': self.sub_end[rows]
+        }
+
+    def _drain_closed_subscriptions(self):
+        """Return closed subscriptions and compact the live arrays down to open ones."""
+        count = self._sub_count
+        closed = self.sub_end[:count] >= 0
+        drained = self._subscription_rows(np.flatnonzero(closed))
+
+        open_rows = np.flatnonzero(~closed)
+        new_position = np.full(count, -1, dtype=np.int64)
+        new_position[open_rows] = np.arange(len(open_rows))
+        for name in SUBSCRIPTION_ARRAYS:
+            values = getattr(self, name)
+            values[:len(open_rows)] = values[open_rows]
+        self.sub_end[len(open_rows):count] = -1
+        self.current_sub = np.where(self.current_sub >= 0, new_position[self.current_sub], -1)
+        self._sub_count = len(open_rows)
+        return drained
+
+    def _ensure_subscription_capacity(self, required):
+        capacity = len(self.sub_id)
+        if required <= capacity:
+            return
+        new_capacity = max(required, 2 * capacity)
+        for name in SUBSCRIPTION_ARRAYS:
+            old = getattr(self, name)
+            grown = np.full(new_capacity, -1 if name == 'sub_end' else 0, dtype=old.dtype)
+            grown[:capacity] = old
+            setattr(self, name, grown)
+
+    def _export_subscriptions(self, customer_ids, subscriptions):
+        plan = subscriptions['plan']
+        end = subscriptions['end_day']
+        closed = end >= 0
+
+        return conform('subscriptions', pd.DataFrame({
+            'id': subscriptions['id'],
+            'customer_id': customer_ids[subscriptions['customer']],
+            'plan_id': self.plan_ids[plan],
+            'plan_name': categorical_from_codes('subscriptions', 'plan_name', plan, self.plan_labels),
+            'start_date': to_dates(subscriptions['start_day']),
+            'end_date': to_dates(end),
+            'monthly_price': self.plan_price[plan],
+            'status': categorical_from_codes('subscriptions', 'status', closed, SUBSCRIPTION_STATUSES),
+            'billing_cycle': categorical_from_codes('subscriptions', 'billing_cycle', np.zeros(len(plan)), ['monthly'])
+        }))
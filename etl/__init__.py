@@ -1,4 +1,4 @@
-from etl.db_connection import DatabaseConnection, get_db_connection
+from etl.db_connection import DatabaseConnection, get_db_connection, get_engine, dispose_engines
 from etl.config import Config
 
-__all__ = ['DatabaseConnection', 'get_db_connection', 'Config']
\ No newline at end of file
+__all__ = ['DatabaseConnection', 'get_db_connection', 'get_engine', 'dispose_engines', 'Config']
\ No newline at end of file
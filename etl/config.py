@@ -12,7 +12,21 @@ class Config:
 
     DATABASE_URL = f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
 
+    DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', '5'))
+    DB_MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', '10'))
+    DB_POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', '30'))
+    DB_POOL_RECYCLE = int(os.getenv('DB_POOL_RECYCLE', '1800'))
+    DB_POOL_PRE_PING = os.getenv('DB_POOL_PRE_PING', 'true').lower() in ('1', 'true', 'yes')
+
+    # 0 loads with one worker per core, capped at what the connection pool can hand out
+    FACT_LOAD_WORKERS = int(os.getenv('FACT_LOAD_WORKERS', '0'))
+    FACT_LOAD_RETRIES = int(os.getenv('FACT_LOAD_RETRIES', '3'))
+
     RAW_DATA_PATH = 'simulation_output'
+    # Rows per chunk when the loaders stream raw tables into the database
+    LOAD_CHUNK_ROWS = int(os.getenv('LOAD_CHUNK_ROWS', '100000'))
+    # Simulated months queued for the warehouse loader before the simulator waits for it
+    PIPELINE_QUEUE_BATCHES = int(os.getenv('PIPELINE_QUEUE_BATCHES', '2'))
 
     @classmethod
     def validate(cls):
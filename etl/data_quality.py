@@ -2,8 +2,8 @@ from etl.db_connection import get_db_connection
 
 class DataQualityChecker:
     
-    def __init__(self):
-        self.db = get_db_connection()
+    def __init__(self, db=None):
+        self.db = db or get_db_connection()
         self.checks_passed = 0
         self.checks_failed = 0
     
@@ -85,6 +85,16 @@ class DataQualityChecker:
             "SELECT COUNT(*) FROM fact_billing WHERE amount < 0;"
         )
         
+        self.run_check(
+            "Usage events record only known features",
+            """
+            SELECT COUNT(*) 
+            FROM fact_usage 
+            WHERE feature_used = 0 
+               OR (feature_used & ~(SELECT SUM(feature_mask) FROM dim_features)) <> 0;
+            """
+        )
+        
         self.run_check(
             "Usage events have at least one metric > 0",
             """
@@ -184,6 +194,19 @@ class DataQualityChecker:
         """)
         for col in usage_stats.columns:
             print(f"    {col}: {usage_stats[col].iloc[0]:,.0f}")
+        
+        print("\n  FEATURE ADOPTION:")
+        adoption_stats = self.db.execute_query("""
+            SELECT 
+                df.feature_name,
+                COUNT(DISTINCT fu.customer_id) as customers
+            FROM dim_features df
+            LEFT JOIN fact_usage fu ON (fu.feature_used & df.feature_mask) <> 0
+            GROUP BY df.feature_name, df.feature_bit
+            ORDER BY df.feature_bit;
+        """)
+        for _, row in adoption_stats.iterrows():
+            print(f"    {row['feature_name']}: {row['customers']:,} customers")
     
     def run_all_checks(self):
         print("\n" + "="*60)
@@ -191,16 +214,19 @@ class DataQualityChecker:
         print("="*60)
         
         try:
-            self.check_referential_integrity()
-            self.check_data_completeness()
-            self.check_business_logic()
-            self.generate_summary_stats()
+            # Every check reads over one pooled connection instead of checking one out per query
+            with self.db.connection():
+                self.check_referential_integrity()
+                self.check_data_completeness()
+                self.check_business_logic()
+                self.generate_summary_stats()
             
             print("\n" + "="*60)
             print("FINAL RESULTS")
             print("="*60)
             print(f"  ✓ Checks passed: {self.checks_passed}")
             print(f"  ✗ Checks failed: {self.checks_failed}")
+            print(f"  Connection pool: {self.db.pool_metrics()}")
             
             if self.checks_failed == 0:
                 print("\n  🎉 ALL CHECKS PASSED - Data is ready for dashboards!")
@@ -1,21 +1,154 @@
-from sqlalchemy import create_engine, text
+import io
+import threading
+from contextlib import contextmanager
+
+from sqlalchemy import MetaData, Table, create_engine, event, inspect, make_url, text
 from sqlalchemy.orm import sessionmaker
-from sqlalchemy.pool import NullPool
+from sqlalchemy.pool import QueuePool
 import pandas as pd
 from etl.config import Config
 
+# COPY streams rows through an in-memory CSV buffer that is flushed once it passes this size
+COPY_BUFFER_BYTES = 8 * 1024 * 1024
+COPY_CHUNK_ROWS = 10_000
+EXECUTEMANY_BATCH_ROWS = 10_000
+COPY_DRIVERS = ('psycopg2', 'psycopg')
+
+_registry_lock = threading.RLock()
+_engines = {}
+_pool_metrics = {}
+_connections = {}
+
+
+class PoolMetrics:
+    """Checkouts, new connections and peak usage of one engine's QueuePool, counted by pool event listeners."""
+    
+    def __init__(self, engine, max_overflow):
+        self.engine = engine
+        self.max_overflow = max_overflow
+        self.counts = {'checkouts': 0, 'connects': 0, 'peak_checked_out': 0, 'peak_overflow': 0}
+        self._lock = threading.Lock()
+        event.listen(engine, 'checkout', self._on_checkout)
+        event.listen(engine, 'connect', self._on_connect)
+    
+    def capacity(self):
+        """Most connections handed out at once (pool size plus overflow); None when overflow is unbounded."""
+        return self.engine.pool.size() + self.max_overflow if self.max_overflow > -1 else None
+    
+    def report(self):
+        with self._lock:
+            return dict(self.counts)
+    
+    def _on_checkout(self, dbapi_connection, connection_record, connection_proxy):
+        pool = self.engine.pool
+        with self._lock:
+            self.counts['checkouts'] += 1
+            self.counts['peak_checked_out'] = max(self.counts['peak_checked_out'], pool.checkedout())
+            self.counts['peak_overflow'] = max(self.counts['peak_overflow'], pool.overflow())
+    
+    def _on_connect(self, dbapi_connection, connection_record):
+        with self._lock:
+            self.counts['connects'] += 1
+
+
+def _default_url():
+    Config.validate()
+    return Config.DATABASE_URL
+
+
+def get_engine(database_url=None, pool_size=None, max_overflow=None, pool_timeout=None, pool_recycle=None,
+               pool_pre_ping=None):
+    """The process-wide pooled engine for database_url, built on first use.
+    
+    Pool settings default to Config's DB_POOL_* values; engines with different
+    settings for the same URL are kept apart. In-memory SQLite keeps
+    SQLAlchemy's default single-connection pool, since a second connection
+    would see a different database. Every other engine gets a QueuePool whose
+    usage is counted into a PoolMetrics (see pool_metrics()).
+    """
+    database_url = str(database_url or _default_url())
+    options = {
+        'pool_size': Config.DB_POOL_SIZE if pool_size is None else pool_size,
+        'max_overflow': Config.DB_MAX_OVERFLOW if max_overflow is None else max_overflow,
+        'pool_timeout': Config.DB_POOL_TIMEOUT if pool_timeout is None else pool_timeout,
+        'pool_recycle': Config.DB_POOL_RECYCLE if pool_recycle is None else pool_recycle,
+        'pool_pre_ping': Config.DB_POOL_PRE_PING if pool_pre_ping is None else pool_pre_ping
+    }
+    key = (database_url, tuple(sorted(options.items())))
+    with _registry_lock:
+        if key not in _engines:
+            url = make_url(database_url)
+            if url.get_backend_name() == 'sqlite' and url.database in (None, '', ':memory:'):
+                _engines[key] = create_engine(database_url, echo=False)
+            else:
+                engine = create_engine(database_url, poolclass=QueuePool, echo=False, **options)
+                _pool_metrics[engine] = PoolMetrics(engine, options['max_overflow'])
+                _engines[key] = engine
+        return _engines[key]
+
+
+def dispose_engines():
+    """Close the pooled connections of every registered engine, e.g. at the end of a pipeline run."""
+    with _registry_lock:
+        for engine in _engines.values():
+            engine.dispose()
+
+
 class DatabaseConnection:
+    """Query and bulk-load helpers over a shared pooled engine (see get_engine).
     
-    def __init__(self):
-        Config.validate()
-        
-        self.engine = create_engine(
-            Config.DATABASE_URL,
-            poolclass=NullPool,  
-            echo=False  
-        )
-        
+    Every call checks a connection out of the pool and returns it afterwards;
+    wrap a run of queries in connection() to keep one connection for all of them.
+    """
+    
+    def __init__(self, database_url=None, **pool_options):
+        self.engine = get_engine(database_url, **pool_options)
+        self.metrics = _pool_metrics.get(self.engine)
         self.Session = sessionmaker(bind=self.engine)
+        self._local = threading.local()
+    
+    @contextmanager
+    def connection(self):
+        """Hold one pooled connection on this thread; execute_query, get_table_count and execute_statement reuse it."""
+        held = getattr(self._local, 'connection', None)
+        if held is not None:
+            yield held
+            return
+        with self.engine.connect() as conn:
+            self._local.connection = conn
+            try:
+                yield conn
+            finally:
+                self._local.connection = None
+    
+    @contextmanager
+    def _connect(self):
+        held = getattr(self._local, 'connection', None)
+        if held is None:
+            with self.engine.connect() as conn:
+                yield conn
+            return
+        try:
+            yield held
+        finally:
+            # End the implicit read transaction so a held connection does not pin locks or snapshots
+            if held.in_transaction():
+                held.rollback()
+    
+    def pool_metrics(self):
+        """Checkouts, new connections, current and peak checked-out connections and overflow of the shared pool."""
+        pool = self.engine.pool
+        report = {'pool': type(pool).__name__}
+        if isinstance(pool, QueuePool):
+            report.update(size=pool.size(), checked_out=pool.checkedout(), overflow=max(0, pool.overflow()))
+        if self.metrics is not None:
+            report.update(self.metrics.report())
+            report['peak_overflow'] = max(0, report['peak_overflow'])
+        return report
+    
+    def pool_capacity(self):
+        """Most connections the pool hands out at once (pool size plus overflow); None when unbounded."""
+        return self.metrics.capacity() if self.metrics is not None else None
     
     def test_connection(self):
         try:
@@ -31,38 +164,165 @@ class DatabaseConnection:
     
     def get_table_count(self, table_name):
         query = f"SELECT COUNT(*) FROM {table_name};"
-        with self.engine.connect() as conn:
+        with self._connect() as conn:
             result = conn.execute(text(query))
             return result.fetchone()[0]
     
     def truncate_table(self, table_name):
-        with self.engine.connect() as conn:
+        with self._connect() as conn:
             conn.execute(text(f"TRUNCATE TABLE {table_name} CASCADE;"))
             conn.commit()
             print(f"  Truncated table: {table_name}")
     
-    def load_dataframe(self, df, table_name, if_exists='append'):
+    def load_dataframe(self, df, table_name, if_exists='append', column_map=None, method='copy'):
+        """Bulk-load df into table_name, creating the table from df's dtypes if it does not exist.
+        
+        column_map renames DataFrame columns to table columns; the table may
+        have further columns (serial keys, defaults) that are left to the
+        database. method='copy' streams rows with COPY FROM STDIN on
+        PostgreSQL and falls back to executemany on backends without COPY;
+        'executemany' forces the fallback and 'multi' is the old
+        to_sql(method='multi') path.
+        """
+        if column_map:
+            df = df.rename(columns=column_map)
         try:
-            rows_inserted = df.to_sql(
-                table_name,
-                self.engine,
-                if_exists=if_exists,
-                index=False,
-                method='multi',
-                chunksize=1000
-            )
+            if method == 'multi':
+                rows_inserted = df.to_sql(
+                    table_name,
+                    self.engine,
+                    if_exists=if_exists,
+                    index=False,
+                    method='multi',
+                    chunksize=1000
+                )
+            else:
+                rows_inserted = self._bulk_load([df], table_name, if_exists, method)
             print(f"   Loaded {len(df)} rows into {table_name}")
             return rows_inserted
         except Exception as e:
             print(f"   Failed to load data into {table_name}: {e}")
             raise
     
+    def load_chunks(self, chunks, table_name, if_exists='append', column_map=None, method='copy'):
+        """Bulk-load an iterable of DataFrames into table_name as one transaction, holding one chunk at a time.
+        
+        The table is created from the first chunk's dtypes; see load_dataframe
+        for column_map and method. Returns the number of rows loaded.
+        """
+        if column_map:
+            chunks = (chunk.rename(columns=column_map) for chunk in chunks)
+        try:
+            rows_inserted = self._bulk_load(chunks, table_name, if_exists, method)
+            print(f"   Loaded {rows_inserted} rows into {table_name}")
+            return rows_inserted
+        except Exception as e:
+            print(f"   Failed to load data into {table_name}: {e}")
+            raise
+    
+    def has_table(self, table_name):
+        return inspect(self.engine).has_table(table_name)
+    
+    def create_table(self, df, table_name, if_exists='append'):
+        """Create table_name with df's columns and types unless it exists (always, for 'replace'); loads no rows."""
+        if if_exists == 'replace' or not self.has_table(table_name):
+            df.head(0).to_sql(table_name, self.engine, if_exists=if_exists, index=False)
+        elif if_exists == 'fail':
+            raise ValueError(f"Table '{table_name}' already exists.")
+    
+    def _bulk_load(self, chunks, table_name, if_exists, method):
+        chunks = iter(chunks)
+        df = next(chunks, None)
+        if df is None:
+            return 0
+        self.create_table(df, table_name, if_exists)
+        
+        table_columns = {column['name'] for column in inspect(self.engine).get_columns(table_name)}
+        missing = [column for column in df.columns if column not in table_columns]
+        if missing:
+            raise ValueError(f"{table_name} has no columns {missing}; map them with column_map")
+        
+        rows = 0
+        use_copy = method == 'copy' and self.engine.dialect.driver in COPY_DRIVERS
+        with self.engine.begin() as conn:
+            # Fetch the next chunk only after the current one is written, so one chunk is held at a time
+            while df is not None:
+                if use_copy:
+                    self._copy_rows(conn, df, table_name)
+                else:
+                    self._executemany_rows(conn, df, table_name)
+                rows += len(df)
+                df = next(chunks, None)
+        return rows
+    
+    def _copy_rows(self, conn, df, table_name):
+        """COPY df in CSV format, one COPY statement per COPY_BUFFER_BYTES of rows, inside conn's transaction."""
+        preparer = self.engine.dialect.identifier_preparer
+        columns = ', '.join(preparer.quote(column) for column in df.columns)
+        statement = f"COPY {preparer.quote(table_name)} ({columns}) FROM STDIN WITH (FORMAT csv)"
+        cursor = conn.connection.driver_connection.cursor()
+        df = _integral_floats_as_integers(df)
+        
+        buffer = io.StringIO()
+        for start in range(0, len(df), COPY_CHUNK_ROWS):
+            df.iloc[start:start + COPY_CHUNK_ROWS].to_csv(buffer, header=False, index=False)
+            if buffer.tell() >= COPY_BUFFER_BYTES or start + COPY_CHUNK_ROWS >= len(df):
+                buffer.seek(0)
+                if hasattr(cursor, 'copy_expert'):
+                    cursor.copy_expert(statement, buffer)
+                else:
+                    with cursor.copy(statement) as copy:
+                        copy.write(buffer.getvalue())
+                buffer = io.StringIO()
+    
+    def _executemany_rows(self, conn, df, table_name):
+        """Insert through the reflected table in EXECUTEMANY_BATCH_ROWS batches, so values get the column types' conversions."""
+        table = Table(table_name, MetaData(), autoload_with=conn)
+        names = list(df.columns)
+        for start in range(0, len(df), EXECUTEMANY_BATCH_ROWS):
+            chunk = df.iloc[start:start + EXECUTEMANY_BATCH_ROWS]
+            columns = [chunk[name].astype(object).where(chunk[name].notna(), None).tolist() for name in names]
+            conn.execute(table.insert(), [dict(zip(names, row)) for row in zip(*columns)])
+    
     def execute_query(self, query):
-        return pd.read_sql(query, self.engine)
+        with self._connect() as conn:
+            return pd.read_sql(query, conn)
+    
+    def execute_statement(self, statement):
+        with self._connect() as conn:
+            conn.execute(text(statement))
+            conn.commit()
+    
+    @contextmanager
+    def transaction(self):
+        """A pooled connection whose statements commit together when the block exits, or roll back if it raises."""
+        with self.engine.begin() as conn:
+            yield conn
     
     def close(self):
-        self.engine.dispose()
-        print("Database connection closed")
+        """Nothing to release: every call returns its connection to the pool as it finishes.
+        
+        The pooled engine is shared through the get_engine registry and outlives
+        this object; dispose_engines() closes its connections.
+        """
+
+def _integral_floats_as_integers(df):
+    """Float columns holding whole numbers (integers with NaN gaps) as nullable Int64.
+    
+    COPY parses text, so 30.0 would be rejected by an integer column where an
+    INSERT parameter would have been cast.
+    """
+    columns = {}
+    for name in df.columns:
+        values = df[name]
+        if values.dtype.kind == 'f' and (values.dropna() % 1 == 0).all():
+            columns[name] = values.astype('Int64')
+    return df.assign(**columns) if columns else df
 
-def get_db_connection():
-    return DatabaseConnection()
+def get_db_connection(database_url=None):
+    """The DatabaseConnection shared by every loader and checker that uses database_url."""
+    database_url = str(database_url or _default_url())
+    with _registry_lock:
+        if database_url not in _connections:
+            _connections[database_url] = DatabaseConnection(database_url)
+        return _connections[database_url]
@@ -0,0 +1,166 @@
+from datetime import datetime
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent.parent))
+
+import pandas as pd
+from sqlalchemy import DateTime, bindparam, text
+
+from etl.load_facts import FactLoader
+from etl.raw_reader import prefetch, raw_table_version
+
+WATERMARK_TABLE = 'etl_watermarks'
+WATERMARK_DDL = f"""
+    CREATE TABLE IF NOT EXISTS {WATERMARK_TABLE} (
+        table_name VARCHAR(64) PRIMARY KEY,
+        high_water_date TIMESTAMP,
+        source_batch VARCHAR(255),
+        rows_merged BIGINT,
+        loaded_at TIMESTAMP
+    );
+"""
+WATERMARK_UPSERT = text(f"""
+    INSERT INTO {WATERMARK_TABLE} (table_name, high_water_date, source_batch, rows_merged, loaded_at)
+    VALUES (:table_name, :high_water_date, :source_batch, :rows_merged, :loaded_at)
+    ON CONFLICT (table_name) DO UPDATE SET
+        high_water_date = excluded.high_water_date,
+        source_batch = excluded.source_batch,
+        rows_merged = excluded.rows_merged,
+        loaded_at = excluded.loaded_at;
+""").bindparams(bindparam('high_water_date', type_=DateTime()), bindparam('loaded_at', type_=DateTime()))
+
+# Fact table -> raw source, FactLoader chunk generator, merge key, and the date columns its watermark follows
+INCREMENTAL_TABLES = {
+    'fact_subscriptions': {
+        'source': 'subscriptions', 'chunks': 'subscription_chunks',
+        'key': ['subscription_id'], 'dates': ['start_date', 'end_date']
+    },
+    'fact_usage': {
+        'source': 'usage_events', 'chunks': 'usage_chunks',
+        'key': ['customer_id', 'date'], 'dates': ['date']
+    },
+    'fact_billing': {
+        'source': 'billing_transactions', 'chunks': 'billing_chunks',
+        'key': ['customer_id', 'transaction_date', 'transaction_type'], 'dates': ['transaction_date']
+    }
+}
+
+
+class IncrementalFactLoader(FactLoader):
+    """Merges only new and changed raw rows into the fact tables.
+
+    etl_watermarks records, per fact table, the latest date merged and the
+    version of the raw files it came from (the source batch). A table whose
+    files have not changed is skipped. Otherwise the rows dated on or after the
+    watermark are staged in stage_<table> and merged with INSERT ... ON
+    CONFLICT on the table's natural key, so rows already loaded are updated in
+    place rather than duplicated. Open subscriptions are staged on every run so
+    they pick up their end date once they close. Re-running a load is a no-op.
+    """
+
+    def load_all_facts(self):
+        print("\n" + "="*60)
+        print("INCREMENTAL FACT LOADING PIPELINE")
+        print("="*60)
+
+        try:
+            self.db.execute_statement(WATERMARK_DDL)
+            merged = {fact_table: self.merge_table(fact_table) for fact_table in INCREMENTAL_TABLES}
+            if any(merged.values()):
+                self.report_subscriptions()
+                self.report_usage()
+                self.report_billing()
+
+            print("\n" + "="*60)
+            print("ALL FACTS UP TO DATE")
+            print("="*60)
+
+        except Exception as e:
+            print(f"\n Error loading facts: {e}")
+            raise
+        finally:
+            self.db.close()
+
+        return merged
+
+    def watermarks(self):
+        """Per fact table: high_water_date, source_batch, rows_merged and loaded_at of its last merge."""
+        df = self.db.execute_query(f"SELECT * FROM {WATERMARK_TABLE};")
+        df['high_water_date'] = pd.to_datetime(df['high_water_date'])
+        return df.set_index('table_name').to_dict('index')
+
+    def merge_table(self, fact_table):
+        spec = INCREMENTAL_TABLES[fact_table]
+        mark = self.watermarks().get(fact_table)
+        source_batch = raw_table_version(self.data_path, spec['source'])
+
+        print(f"\n  {fact_table}:")
+        if mark is not None and mark['source_batch'] == source_batch:
+            print(f"    Source unchanged since {mark['loaded_at']}; nothing to load")
+            return 0
+
+        high_water = mark['high_water_date'] if mark is not None else pd.NaT
+        since = None if pd.isna(high_water) else (spec['dates'], high_water)
+        print(f"    Staging rows dated on or after {high_water.date()}" if since else "    Staging all rows")
+
+        stage = f'stage_{fact_table}'
+        columns = []
+        latest = [high_water]
+
+        def staged_chunks():
+            for df in getattr(self, spec['chunks'])(since):
+                if not columns:
+                    columns.extend(df.columns)
+                    self.db.create_table(df, fact_table)
+                latest.extend(df[column].max() for column in spec['dates'])
+                yield df
+
+        merged = 0
+        try:
+            staged = self.db.load_chunks(prefetch(staged_chunks()), stage, if_exists='replace')
+            with self.db.transaction() as conn:
+                if staged:
+                    self._ensure_merge_key(conn, fact_table, spec['key'])
+                    merged = conn.execute(text(self._merge_statement(fact_table, stage, columns, spec['key']))).rowcount
+                latest = [value for value in latest if pd.notna(value)]
+                conn.execute(WATERMARK_UPSERT, {
+                    'table_name': fact_table,
+                    'high_water_date': max(latest).to_pydatetime() if latest else None,
+                    'source_batch': source_batch,
+                    'rows_merged': merged,
+                    'loaded_at': datetime.now()
+                })
+        finally:
+            # Also clears a stage left half-filled by a failed load
+            self.db.execute_statement(f"DROP TABLE IF EXISTS {stage};")
+
+        print(f"    Merged {merged} of {staged} staged rows into {fact_table}")
+        return merged
+
+    def _ensure_merge_key(self, conn, fact_table, key):
+        # ON CONFLICT needs a unique index on the key; tables filled by appends may not have one yet
+        try:
+            conn.execute(text(
+                f"CREATE UNIQUE INDEX IF NOT EXISTS {fact_table}_merge_key ON {fact_table} ({', '.join(key)});"
+            ))
+        except Exception as e:
+            raise ValueError(f"{fact_table} has duplicate ({', '.join(key)}) rows; truncate and reload it "
+                             f"before loading incrementally") from e
+
+    def _merge_statement(self, fact_table, stage, columns, key):
+        column_list = ', '.join(columns)
+        updates = ', '.join(f"{column} = excluded.{column}" for column in columns if column not in key)
+        # WHERE true keeps SQLite from reading ON CONFLICT as a join constraint
+        return f"""
+            INSERT INTO {fact_table} ({column_list})
+            SELECT {column_list} FROM {stage} WHERE true
+            ON CONFLICT ({', '.join(key)}) DO UPDATE SET {updates};
+        """
+
+
+def main():
+    loader = IncrementalFactLoader()
+    loader.load_all_facts()
+
+if __name__ == "__main__":
+    main()
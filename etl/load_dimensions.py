@@ -2,48 +2,100 @@ import pandas as pd
 from pathlib import Path
 from etl.db_connection import get_db_connection
 from etl.config import Config
+from etl.raw_reader import iter_raw_table, prefetch, read_raw_table
+from config.business_rules import FEATURE_BITS
+from core.day_offsets import SIMULATION_START
+
+# Applies final customer states staged in stage_customer_states; portable to SQLite and PostgreSQL
+CUSTOMER_STATE_UPDATE = """
+    UPDATE dim_customers
+    SET status = (
+            SELECT s.status FROM stage_customer_states s WHERE s.customer_id = dim_customers.customer_id
+        ),
+        current_plan_tier = (
+            SELECT s.current_plan_tier FROM stage_customer_states s WHERE s.customer_id = dim_customers.customer_id
+        )
+    WHERE customer_id IN (SELECT customer_id FROM stage_customer_states);
+"""
 
 class DimensionLoader:
-    def __init__(self):
-        self.db = get_db_connection()
-        self.data_path = Path(Config.RAW_DATA_PATH)
+    def __init__(self, db=None, data_path=None, chunk_rows=None):
+        self.db = db or get_db_connection()
+        self.data_path = Path(data_path or Config.RAW_DATA_PATH)
+        self.chunk_rows = chunk_rows or Config.LOAD_CHUNK_ROWS
 
-    def load_plans(self):
+    def load_dates(self, days):
+        """Create dim_date (date, date_id) covering days days from SIMULATION_START, unless the warehouse has one."""
+        print("\n" + "="*60)
+        print("Loading dim_date...")
+        print("="*60)
+
+        if not self.db.has_table('dim_date'):
+            dates = pd.date_range(SIMULATION_START, periods=days)
+            self.db.load_dataframe(pd.DataFrame({'date': dates, 'date_id': range(1, days + 1)}), 'dim_date')
+
+        count = self.db.get_table_count('dim_date')
+        print(f"  dim_date now has {count} rows")
+
+        return count
+
+    def load_plans(self, df=None):
+        """Load plans from df, or from the raw plans table when df is None."""
         print("\n" + "="*60)
         print("Loading dim_plans...")
         print("="*60)
 
-        df = pd.read_csv(self.data_path / 'plans.csv')
-        print(f"  Read {len(df)} plans from CSV")
+        if df is None:
+            df = read_raw_table(self.data_path, 'plans')
+        print(f"  Read {len(df)} plans")
+
+        # In-memory and Parquet plans carry feature lists; store them in the same text form as the CSV flow
+        if 'features' in df:
+            df = df.assign(features=[
+                features if isinstance(features, str) else str([str(feature) for feature in features])
+                for features in df['features']
+            ])
 
-        df = df.rename(columns={
+        self.db.load_dataframe(df, 'dim_plans', if_exists='append', column_map={
             'id': 'plan_id',
             'name': 'plan_name'
         })
 
-        self.db.load_dataframe(df, 'dim_plans', if_exists='append')
-
         count = self.db.get_table_count('dim_plans')
         print(f"  dim_plans now has {count} rows")
 
         return count
     
-    def load_customers(self):
+    def load_features(self):
         print("\n" + "="*60)
-        print("Loading dim_customers...")
+        print("Loading dim_features...")
         print("="*60)
 
-        df = pd.read_csv(self.data_path / 'customers.csv')
-        print(f"  Read {len(df)} customers from CSV")
+        df = pd.DataFrame({
+            'feature_name': list(FEATURE_BITS),
+            'feature_bit': list(FEATURE_BITS.values()),
+            'feature_mask': [1 << bit for bit in FEATURE_BITS.values()]
+        })
+
+        self.db.load_dataframe(df, 'dim_features', if_exists='append')
 
-        df = df.rename(columns={
+        count = self.db.get_table_count('dim_features')
+        print(f"  dim_features now has {count} rows")
+
+        return count
+    
+    def load_customers(self, df=None):
+        """Load customers from df, or stream them from the raw customers table when df is None."""
+        print("\n" + "="*60)
+        print("Loading dim_customers...")
+        print("="*60)
+
+        chunks = [df] if df is not None else prefetch(iter_raw_table(self.data_path, 'customers', self.chunk_rows))
+        rows = self.db.load_chunks(chunks, 'dim_customers', if_exists='append', column_map={
             'id': 'customer_id',
             'plan_tier': 'current_plan_tier'
         })
-
-        df['signup_date'] = pd.to_datetime(df['signup_date'])
-
-        self.db.load_dataframe(df, 'dim_customers', if_exists='append')
+        print(f"  Read {rows} customers")
 
         count = self.db.get_table_count('dim_customers')
         print(f"  dim_customers now has {count} rows")
@@ -61,6 +113,21 @@ class DimensionLoader:
 
         return count
     
+    def update_customer_states(self, df):
+        """Overwrite status and current_plan_tier of the customers in df (raw customers columns) with df's values."""
+        if len(df) == 0:
+            return 0
+        self.db.load_dataframe(df[['id', 'status', 'plan_tier']], 'stage_customer_states', if_exists='replace',
+                               column_map={'id': 'customer_id', 'plan_tier': 'current_plan_tier'})
+        try:
+            # Without an index the correlated lookups scan the staging table once per updated customer
+            self.db.execute_statement("CREATE INDEX stage_customer_states_id ON stage_customer_states (customer_id);")
+            self.db.execute_statement(CUSTOMER_STATE_UPDATE)
+        finally:
+            self.db.execute_statement("DROP TABLE stage_customer_states;")
+        print(f"  Updated final state of {len(df)} customers")
+        return len(df)
+    
     def load_all_dimensions(self):
         print("\n" + "="*60)
         print("DIMENSION LOADING PIPELINE")
@@ -68,6 +135,7 @@ class DimensionLoader:
 
         try:
             self.load_plans()
+            self.load_features()
             self.load_customers()
 
             print("\n" + "="*60)
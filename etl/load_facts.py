@@ -1,3 +1,4 @@
+import numpy as np
 import pandas as pd
 from pathlib import Path
 import sys
@@ -6,53 +7,114 @@ sys.path.append(str(Path(__file__).parent.parent))
 
 from etl.db_connection import get_db_connection
 from etl.config import Config
+from etl.raw_reader import iter_raw_table, prefetch
+from core.schema import CENTS_PER_DOLLAR
+
+# One row per (usage event, feature used), resolved with a bitwise AND against dim_features
+FEATURE_USAGE_VIEW = """
+    CREATE VIEW fact_usage_features AS
+    SELECT fu.customer_id, fu.date, fu.date_id, df.feature_name
+    FROM fact_usage fu
+    JOIN dim_features df ON (fu.feature_used & df.feature_mask) <> 0;
+"""
+
+# Raw columns each fact table is built from, and the fact table's column order
+SUBSCRIPTION_SOURCE_COLUMNS = [
+    'id', 'customer_id', 'plan_id', 'plan_name', 'start_date', 'end_date', 'monthly_price', 'status', 'billing_cycle'
+]
+SUBSCRIPTION_COLUMNS = ['subscription_id'] + SUBSCRIPTION_SOURCE_COLUMNS[1:] + [
+    'duration_days', 'is_upgrade', 'is_downgrade'
+]
+USAGE_SOURCE_COLUMNS = [
+    'customer_id', 'date', 'api_calls', 'data_points_ingested', 'queries_executed', 'projects_active', 'feature_used'
+]
+USAGE_COLUMNS = [
+    'customer_id', 'date', 'date_id', 'api_calls', 'data_points_ingested', 'queries_executed', 'projects_active',
+    'feature_used'
+]
+BILLING_SOURCE_COLUMNS = ['customer_id', 'transaction_date', 'amount_cents', 'type', 'status']
+BILLING_COLUMNS = ['customer_id', 'transaction_date', 'date_id', 'amount', 'transaction_type', 'status']
 
 class FactLoader:
-    def __init__(self):
-        self.db = get_db_connection()
-        self.data_path = Path(Config.RAW_DATA_PATH)
+    """Streams each raw table through read -> map -> bulk load in chunks of chunk_rows rows.
+
+    A background thread reads and maps the next chunks while the current one
+    loads, and each table loads in a single transaction.
+    """
+
+    def __init__(self, db=None, data_path=None, chunk_rows=None):
+        self.db = db or get_db_connection()
+        self.data_path = Path(data_path or Config.RAW_DATA_PATH)
+        self.chunk_rows = chunk_rows or Config.LOAD_CHUNK_ROWS
 
         self.date_lookup = self._load_date_lookup()
 
     def _load_date_lookup(self):
         query = "SELECT date, date_id FROM dim_date;"
         df = self.db.execute_query(query)
-        return dict(zip(df['date'], df['date_id']))
+        return pd.Series(df['date_id'].to_numpy(), index=pd.DatetimeIndex(pd.to_datetime(df['date'])))
     
     def _map_date_to_id(self, date_series):
-        return date_series.map(self.date_lookup)
-    def load_subscriptions(self):
-        print("\n" + "="*60)
-        print("Loading fact_subscriptions...")
-        print("="*60)
-
-        df = pd.read_csv(self.data_path / 'subscriptions.csv')
-        print(f"  Read {len(df )} subscriptions from CSV")
-
-        df['start_date'] = pd.to_datetime(df['start_date'])
-        df['end_date'] = pd.to_datetime(df['end_date'])
+        positions = self.date_lookup.index.get_indexer(date_series)
+        date_ids = np.where(positions >= 0, self.date_lookup.to_numpy()[positions], np.nan)
+        return pd.Series(date_ids, index=date_series.index)
+
+    def _with_date_ids(self, chunk, date_column):
+        """Add date_id in place, dropping rows whose date is not in dim_date."""
+        chunk['date_id'] = self._map_date_to_id(chunk[date_column])
+        unmapped = chunk['date_id'].isna().sum()
+        if unmapped > 0:
+            print(f"  WARNING: {unmapped} dates could not be mapped to date_id")
+            chunk = chunk.dropna(subset=['date_id'])
+        chunk['date_id'] = chunk['date_id'].astype(int)
+        return chunk
 
-        df['duration_days'] = (df['end_date'] - df['start_date']).dt.days
+    def _chunks(self, table, columns, since=None):
+        return iter_raw_table(self.data_path, table, self.chunk_rows, columns, since)
 
+    def map_subscriptions(self, df):
+        """fact_subscriptions rows for a frame of SUBSCRIPTION_SOURCE_COLUMNS; adds columns to df in place."""
+        # Float in every chunk (NaN while a subscription is open), so the column type never depends on the chunk
+        df['duration_days'] = (df['end_date'] - df['start_date']).dt.days.astype(np.float64)
         df['is_upgrade'] = False
         df['is_downgrade'] = False
+        return df.rename(columns={'id': 'subscription_id'})[SUBSCRIPTION_COLUMNS]
+
+    def map_usage(self, df):
+        """fact_usage rows for a frame of USAGE_SOURCE_COLUMNS."""
+        return self._with_date_ids(df, 'date')[USAGE_COLUMNS]
+
+    def map_billing(self, df):
+        """fact_billing rows for a frame of BILLING_SOURCE_COLUMNS."""
+        df = self._with_date_ids(df, 'transaction_date')
+        df['amount'] = df['amount_cents'] / CENTS_PER_DOLLAR
+        return df.rename(columns={'type': 'transaction_type'})[BILLING_COLUMNS]
+
+    def subscription_chunks(self, since=None):
+        """fact_subscriptions rows, one mapped chunk at a time; since as in iter_raw_table."""
+        for df in self._chunks('subscriptions', SUBSCRIPTION_SOURCE_COLUMNS, since):
+            yield self.map_subscriptions(df)
+
+    def usage_chunks(self, since=None):
+        """fact_usage rows, one mapped chunk at a time; since as in iter_raw_table."""
+        for df in self._chunks('usage_events', USAGE_SOURCE_COLUMNS, since):
+            yield self.map_usage(df)
 
-        df_mapped = pd.DataFrame({
-            'customer_id': df['customer_id'],
-            'plan_id': df['plan_id'],
-            'plan_name': df['plan_name'],
-            'start_date': df['start_date'],
-            'end_date': df['end_date'],
-            'monthly_price': df['monthly_price'],
-            'status': df['status'],
-            'billing_cycle': df['billing_cycle'],
-            'duration_days': df['duration_days'],
-            'is_upgrade': df['is_upgrade'],
-            'is_downgrade': df['is_downgrade']            
-        })
-
-        self.db.load_dataframe(df_mapped, 'fact_subscriptions', if_exists='append')
+    def billing_chunks(self, since=None):
+        """fact_billing rows, one mapped chunk at a time; since as in iter_raw_table."""
+        for df in self._chunks('billing_transactions', BILLING_SOURCE_COLUMNS, since):
+            yield self.map_billing(df)
 
+    def load_subscriptions(self):
+        print("\n" + "="*60)
+        print("Loading fact_subscriptions...")
+        print("="*60)
+
+        rows = self.db.load_chunks(prefetch(self.subscription_chunks()), 'fact_subscriptions', if_exists='append')
+        print(f"  Read {rows} subscriptions")
+        return self.report_subscriptions()
+
+    def report_subscriptions(self):
         count = self.db.get_table_count('fact_subscriptions')
         print(f"  fact_subcriptions now has {count} rows")
 
@@ -63,66 +125,34 @@ class FactLoader:
         print("Loading fact_usage...")
         print("="*60)
 
-        df = pd.read_csv(self.data_path / 'usage_events.csv')
-        print(f"  Read {len(df)} usage events from CSV")
-
-        df['date'] = pd.to_datetime(df['date'])
-
-        print("  Mapping dates to date_ids...")
-        df['date_id'] = self._map_date_to_id(df['date'])
-
-        unmapped = df['date_id'].isna().sum()
-        if unmapped > 0:
-            print(f"  WARNING: {unmapped} dates could not be mapped to date_id")
-            df = df.dropna(subset=['date_id'])
-
-        df_mapped = pd.DataFrame({
-            'customer_id': df['customer_id'],
-            'date': df['date'],
-            'date_id': df['date_id'].astype(int),
-            'api_calls': df['api_calls'],
-            'data_points_ingested': df['data_points_ingested'],
-            'queries_executed': df['queries_executed'],
-            'projects_active': df['projects_active'],
-            'feature_used': df['feature_used']            
-        })
-
-        self.db.load_dataframe(df_mapped, 'fact_usage', if_exists='append')
+        rows = self.db.load_chunks(prefetch(self.usage_chunks()), 'fact_usage', if_exists='append')
+        print(f"  Read {rows} usage events")
+        return self.report_usage()
 
+    def report_usage(self):
         count = self.db.get_table_count('fact_usage')
         print(f"  fact_usage now has {count} rows")
 
+        self.create_feature_views()
+
         return count
     
+    def create_feature_views(self):
+        """(Re)create fact_usage_features, the readable one-row-per-feature form of fact_usage.feature_used."""
+        self.db.execute_statement("DROP VIEW IF EXISTS fact_usage_features;")
+        self.db.execute_statement(FEATURE_USAGE_VIEW)
+        print("  Created view fact_usage_features")
+    
     def load_billing(self):
         print("\n" + "="*60)
         print("Loading fact_billing...")
         print("="*60)
 
-        df = pd.read_csv(self.data_path / 'billing_transactions.csv')        
-        print(f"  Read {len(df)} billing transactions from CSV")
-        
-        df['transaction_date'] = pd.to_datetime(df['transaction_date'])
-
-        print("  Mapping dates to date_id...")
-        df['date_id'] = self._map_date_to_id(df['transaction_date'])
-
-        unmapped = df['date_id'].isna().sum()
-        if unmapped > 0:
-            print(f"  WARNING: {unmapped} dates could not be mapped to date_id")
-            df = df.dropna(subset=['date_id'])
-
-        df_mapped = pd.DataFrame({
-            'customer_id': df['customer_id'],
-            'transaction_date': df['transaction_date'],
-            'date_id': df['date_id'].astype(int),
-            'amount': df['amount'],
-            'transaction_type': df['type'],
-            'status': df['status']        
-        })
-
-        self.db.load_dataframe(df_mapped, 'fact_billing', if_exists='append')
+        rows = self.db.load_chunks(prefetch(self.billing_chunks()), 'fact_billing', if_exists='append')
+        print(f"  Read {rows} billing transactions")
+        return self.report_billing()
 
+    def report_billing(self):
         count = self.db.get_table_count('fact_billing')
         print(f"  fact_billing now has {count} rows")
 
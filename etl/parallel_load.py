@@ -0,0 +1,137 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent.parent))
+
+import numpy as np
+
+from etl.config import Config
+from etl.load_facts import FactLoader
+from etl.raw_reader import prefetch
+
+PARTITION_SCHEMES = ('customer', 'month')
+# Fact tables split into partitions; fact_subscriptions is small and loads whole
+PARTITIONED_TABLES = {'fact_usage': 'date', 'fact_billing': 'transaction_date'}
+RETRY_BACKOFF_SECONDS = 0.5
+
+
+class ParallelFactLoader(FactLoader):
+    """Loads the fact tables concurrently over the shared connection pool.
+
+    Each chunk of fact_usage and fact_billing is split into customer-hash or
+    calendar-month partitions, and every partition is bulk-loaded in its own
+    transaction over its own pooled connection by a thread pool. A partition
+    that fails is rolled back and retried on its own, up to `retries` times,
+    without touching the partitions already committed. At most two partitions
+    per worker wait in the queue, so memory stays bounded by the chunk size.
+    """
+
+    def __init__(self, db=None, data_path=None, workers=None, partitions=None, partition_by='customer', retries=None,
+                 chunk_rows=None):
+        super().__init__(db, data_path, chunk_rows)
+        if partition_by not in PARTITION_SCHEMES:
+            raise ValueError(f"partition_by must be one of {PARTITION_SCHEMES}, got {partition_by!r}")
+        self.workers = workers or Config.FACT_LOAD_WORKERS or os.cpu_count() or 1
+        capacity = self.db.pool_capacity()
+        if capacity is not None and not workers:
+            self.workers = min(self.workers, capacity)
+        self.partitions = partitions or self.workers
+        self.partition_by = partition_by
+        self.retries = Config.FACT_LOAD_RETRIES if retries is None else retries
+
+    def partition(self, df, table_name):
+        """Split one mapped fact chunk into the frames loaded as separate units."""
+        if table_name not in PARTITIONED_TABLES or len(df) == 0:
+            return [df]
+        if self.partition_by == 'month':
+            keys = df[PARTITIONED_TABLES[table_name]].dt.to_period('M')
+        else:
+            keys = np.asarray(df['customer_id'], dtype=np.int64) % self.partitions
+        return [part for _, part in df.groupby(keys, sort=True, observed=True)]
+
+    def load_partition(self, df, table_name, part):
+        """Load one partition in a single transaction, retrying it alone on failure."""
+        for attempt in range(self.retries + 1):
+            try:
+                return self.db.load_dataframe(df, table_name, if_exists='append')
+            except Exception as e:
+                if attempt == self.retries:
+                    raise
+                delay = RETRY_BACKOFF_SECONDS * 2 ** attempt
+                print(f"  {table_name} partition {part} failed ({e}); retrying in {delay:.1f}s")
+                time.sleep(delay)
+
+    def load_all_facts(self):
+        print("\n" + "="*60)
+        print(f"PARALLEL FACT LOADING PIPELINE ({self.workers} workers, {self.partition_by} partitions)")
+        print("="*60)
+
+        streams = {
+            'fact_subscriptions': self.subscription_chunks,
+            'fact_usage': self.usage_chunks,
+            'fact_billing': self.billing_chunks
+        }
+        loaded = {table_name: 0 for table_name in streams}
+        queued = threading.BoundedSemaphore(2 * self.workers)
+        failed = threading.Event()
+        start = time.perf_counter()
+
+        def finished(future):
+            queued.release()
+            if future.exception() is not None:
+                failed.set()
+
+        try:
+            with ThreadPoolExecutor(max_workers=self.workers) as executor:
+                loads = {}
+                for table_name, chunks in streams.items():
+                    parts = 0
+                    for index, df in enumerate(prefetch(chunks())):
+                        if index == 0:
+                            # Create the table once up front so concurrent partitions never race on its DDL
+                            self.db.create_table(df, table_name)
+                        for part_df in self.partition(df, table_name):
+                            queued.acquire()
+                            if failed.is_set():
+                                break
+                            future = executor.submit(self.load_partition, part_df, table_name, parts)
+                            future.add_done_callback(finished)
+                            loads[future] = table_name
+                            parts += 1
+                        if failed.is_set():
+                            break
+                    print(f"  {table_name}: queued {parts} partitions")
+                    if failed.is_set():
+                        break
+
+                for future in as_completed(loads):
+                    loaded[loads[future]] += future.result()
+
+            print(f"  Loaded {sum(loaded.values())} rows in {time.perf_counter() - start:.2f}s")
+            self.report_subscriptions()
+            self.report_usage()
+            self.report_billing()
+            print(f"  Connection pool: {self.db.pool_metrics()}")
+
+            print("\n" + "="*60)
+            print("ALL FACTS LOADED SUCCESSFULLY")
+            print("="*60)
+
+        except Exception as e:
+            print(f"\n Error loading facts: {e}")
+            raise
+        finally:
+            self.db.close()
+
+        return loaded
+
+
+def main():
+    loader = ParallelFactLoader()
+    loader.load_all_facts()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+import json
+import os
+import queue
+import threading
+
+import numpy as np
+import pandas as pd
+from pathlib import Path
+import sys
+sys.path.append(str(Path(__file__).parent.parent))
+
+from core.result_sinks import PARQUET_MANIFEST, iter_parquet_table, read_parquet_table
+from core.schema import DATE, OPEN_CATEGORY, TABLE_SCHEMAS, conform
+
+DEFAULT_CHUNK_ROWS = 100_000
+# Chunks read ahead of the loader; with the chunk being read and the one being loaded, at most this + 2 are held
+PREFETCH_CHUNKS = 2
+
+_DONE = object()
+
+
+def read_raw_table(data_path, table, columns=None):
+    """Read a simulation output table, preferring the Parquet dataset when the run wrote one.
+
+    Either way the frame comes back in the table's TABLE_SCHEMAS types;
+    columns limits the read to the named columns.
+    """
+    data_path = Path(data_path)
+    if (data_path / PARQUET_MANIFEST).exists():
+        df = read_parquet_table(data_path, table)
+        return conform(table, df[[column for column in df.columns if columns is None or column in columns]])
+    path = data_path / f'{table}.csv'
+    return conform(table, pd.read_csv(path, **_csv_options(path, table, columns)))
+
+
+def iter_raw_table(data_path, table, chunk_rows=DEFAULT_CHUNK_ROWS, columns=None, since=None):
+    """Yield a simulation output table in conformed DataFrames of at most chunk_rows rows.
+
+    Only one chunk is parsed at a time, so memory stays bounded by chunk_rows
+    rather than the size of the file. since=(date_columns, timestamp) keeps
+    only rows dated on or after timestamp in any of date_columns, or with one
+    of them missing (an open subscription's end_date); Parquet sources skip
+    older row groups without reading them.
+    """
+    data_path = Path(data_path)
+    if (data_path / PARQUET_MANIFEST).exists():
+        for chunk in iter_parquet_table(data_path, table, chunk_rows, _with_legacy_columns(columns),
+                                        _parquet_since(since)):
+            yield conform(table, chunk)
+        return
+    path = data_path / f'{table}.csv'
+    with pd.read_csv(path, chunksize=chunk_rows, **_csv_options(path, table, columns)) as reader:
+        for chunk in reader:
+            chunk = conform(table, chunk)
+            if since is not None:
+                date_columns, timestamp = since
+                keep = np.zeros(len(chunk), dtype=bool)
+                for column in date_columns:
+                    keep |= (chunk[column] >= timestamp).to_numpy() | chunk[column].isna().to_numpy()
+                chunk = chunk[keep]
+                if not len(chunk):
+                    continue
+            yield chunk
+
+
+def raw_table_version(data_path, table):
+    """A string that changes whenever the raw table's files change (size and modification time)."""
+    data_path = Path(data_path)
+    if (data_path / PARQUET_MANIFEST).exists():
+        with open(data_path / PARQUET_MANIFEST) as f:
+            files = [data_path / path for path in json.load(f)['tables'][table]['files']]
+    else:
+        files = [data_path / f'{table}.csv']
+    stats = [os.stat(path) for path in files]
+    return f"{len(files)} files, {sum(stat.st_size for stat in stats)} bytes, " \
+           f"mtime {max((stat.st_mtime_ns for stat in stats), default=0)}"
+
+
+def prefetch(chunks, depth=PREFETCH_CHUNKS):
+    """Iterate chunks while a background thread produces up to depth of them ahead.
+
+    Reading and transforming the next chunks then overlaps with loading the
+    current one. An exception in the producer is re-raised in the consumer;
+    a consumer that stops early stops the producer too.
+    """
+    buffer = queue.Queue(maxsize=depth)
+    stop = threading.Event()
+
+    def put(item):
+        while not stop.is_set():
+            try:
+                buffer.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def produce():
+        try:
+            for chunk in chunks:
+                if not put((chunk, None)):
+                    return
+            put((_DONE, None))
+        except Exception as e:
+            put((_DONE, e))
+
+    thread = threading.Thread(target=produce, daemon=True)
+    thread.start()
+    try:
+        while True:
+            chunk, error = buffer.get()
+            if error is not None:
+                raise error
+            if chunk is _DONE:
+                return
+            yield chunk
+    finally:
+        stop.set()
+
+
+def _parquet_since(since):
+    if since is None:
+        return None
+    import pyarrow.dataset as ds
+    date_columns, timestamp = since
+    expression = None
+    for column in date_columns:
+        condition = (ds.field(column) >= pd.Timestamp(timestamp).to_pydatetime()) | ds.field(column).is_null()
+        expression = condition if expression is None else expression | condition
+    return expression
+
+
+def _with_legacy_columns(columns):
+    # Older outputs carry a dollar 'amount' that conform turns into amount_cents
+    if columns is None or 'amount_cents' not in columns:
+        return columns
+    return list(columns) + ['amount']
+
+
+def _csv_options(path, table, columns):
+    """read_csv arguments that parse a table's CSV straight into its schema types.
+
+    Labels are read as categoricals, dates are parsed by the reader and
+    integers get their narrow dtype, so conform has little left to do. Fixed
+    label sets are read as open categoricals and re-coded by conform, which
+    rejects unknown labels instead of turning them into NaN. Columns whose
+    first value does not look like the schema type (legacy feature strings,
+    floats) are left to inference and conform.
+    """
+    sample = pd.read_csv(path, nrows=1)
+    wanted = _with_legacy_columns(columns)
+    usecols = [column for column in sample.columns if wanted is None or column in wanted]
+    schema = TABLE_SCHEMAS.get(table, {})
+    dtype = {}
+    parse_dates = []
+    for column in usecols:
+        column_type = schema.get(column)
+        if column_type is None:
+            continue
+        if column_type is OPEN_CATEGORY or isinstance(column_type, pd.CategoricalDtype):
+            dtype[column] = OPEN_CATEGORY
+        elif column_type == DATE:
+            parse_dates.append(column)
+        elif np.issubdtype(column_type, np.integer) and pd.api.types.is_integer_dtype(sample[column]):
+            dtype[column] = column_type
+    return {'usecols': usecols, 'dtype': dtype, 'parse_dates': parse_dates}
@@ -1,111 +1,145 @@
-import random
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent.parent))
+
+import numpy as np
 import pandas as pd
-from datetime import datetime, timedelta
+
+from core.day_offsets import DAYS_PER_MONTH, to_dates
+from core.random_streams import RandomStreams
+from core.schema import categorical_from_codes, conform
+
+PROFILE_DRAWS = {
+    'archetype': 0, 'geography': 1, 'industry': 2, 'channel': 3,
+    'signup_month': 4, 'signup_day': 5, 'name_style': 6, 'prefix': 7, 'suffix': 8
+}
+CATEGORY_COLUMNS = {
+    'archetype': 'archetype', 'geography': 'geography', 'industry': 'industry', 'channel': 'acquisition_channel'
+}
+
+GEOGRAPHY_WEIGHTS = {'US': 0.6, 'EU': 0.4}
+INDUSTRY_WEIGHTS = {
+    'ecommerce': 0.25, 'saas_tech': 0.20, 'financial_services': 0.15, 'marketing_agency': 0.15,
+    'healthcare': 0.10, 'manufacturing': 0.10, 'other': 0.05
+}
+CHANNEL_WEIGHTS = {
+    'organic_search': 0.30, 'paid_ads': 0.25, 'referral': 0.15,
+    'direct': 0.15, 'partner': 0.10, 'content_marketing': 0.05
+}
+
+NAME_PREFIXES = [
+    'Apex', 'Nova', 'Prime', 'Elite', 'Summit', 'Vertex', 'Zenith', 'Alpha',
+    'Beta', 'Delta', 'Gamma', 'Meta', 'Ultra', 'Super', 'Mega', 'Hyper',
+    'Smart', 'Quick', 'Fast', 'Rapid', 'Swift', 'Agile', 'Dynamic', 'Global',
+    'Digital', 'Cyber', 'Tech', 'Data', 'Cloud', 'Web', 'Mobile', 'Auto'
+]
+NAME_SUFFIXES = [
+    'Solutions', 'Systems', 'Technologies', 'Dynamics', 'Innovations',
+    'Labs', 'Works', 'Studio', 'Group', 'Corp', 'Inc', 'LLC', 'Ltd',
+    'Enterprises', 'Ventures', 'Partners', 'Associates', 'Consulting',
+    'Services', 'Analytics', 'Intelligence', 'Insights', 'Data', 'Hub'
+]
+STANDALONE_NAMES = NAME_PREFIXES + ['Acme', 'Pioneer', 'Fusion', 'Nexus', 'Quantum']
+STANDALONE_NAME_SHARE = 0.3
+# Every possible company name: standalone names first, then prefix-major "<prefix> <suffix>" pairs
+COMPANY_NAMES = STANDALONE_NAMES + [f"{prefix} {suffix}" for prefix in NAME_PREFIXES for suffix in NAME_SUFFIXES]
+
+MAX_SIGNUP_MONTH = 6
+DEFAULT_CHUNK_SIZE = 1_000_000
+
+
+def _signup_seasonality(months=24):
+    """Signup weight per month: January peaks at 1.3 and September at 1.2."""
+    weights = np.ones(months)
+    weights[0::12] = 1.3
+    weights[8::12] = 1.2
+    return weights
+
 
 class CustomerGenerator:
+    """Draws customer profiles in column batches.
+
+    Every attribute comes from the 'customer_profile' random stream keyed by
+    customer id, so a customer's profile does not depend on the batch or chunk
+    it was generated in.
+    """
+
     def __init__(self, config):
         self.archetypes = config['CUSTOMER_ARCHETYPES']
         self.geographies = config['GEOGRAPHIES']
         self.industries = config['INDUSTRIES']
         self.acquisition_channels = config['ACQUISITION_CHANNELS']
         self.simulation_months = config.get('SIMULATION_MONTHS', 24)
+        self.random_streams = RandomStreams(config.get('RANDOM_SEED'))
+
+        self.archetype_names = list(self.archetypes)
+        self.choices = {
+            'archetype': (self.archetype_names, [a['distribution_weight'] for a in self.archetypes.values()]),
+            'geography': (list(GEOGRAPHY_WEIGHTS), list(GEOGRAPHY_WEIGHTS.values())),
+            'industry': (list(INDUSTRY_WEIGHTS), list(INDUSTRY_WEIGHTS.values())),
+            'channel': (list(CHANNEL_WEIGHTS), list(CHANNEL_WEIGHTS.values())),
+            'signup_month': (
+                list(range(1, MAX_SIGNUP_MONTH + 1)), list(_signup_seasonality()[:MAX_SIGNUP_MONTH])
+            )
+        }
+        self.cumulative_weights = {
+            draw: np.cumsum(weights) for draw, (_, weights) in self.choices.items()
+        }
 
-        self.archetype_weights = []
-        self.archetype_names = []
-        for name, archetype in self.archetypes.items():
-            self.archetype_names.append(name)
-            self.archetype_weights.append(archetype['distribution_weight'])
-
-    def generate(self, num_customers=1000):
-        customers = []
-        
-        for i in range(num_customers):
-            customer = {
-                'id': i + 1,
-                'company_name': self._generate_company_name(),
-                'signup_date': self._generate_signup_date(),
-                'plan_tier': 'Basic',
-                'geography': self._assign_geography(),
-                'industry': self._assign_industry(),
-                'acquisition_channel': self._assign_acquisition_channel(),
-                'status': 'active',
-                'archetype': self._assign_archetype()
-            }
-            customers.append(customer)
-
-        return pd.DataFrame(customers)
-    
-    def _assign_archetype(self):
-        return random.choices(self.archetype_names, weights=self.archetype_weights)[0]
-    
-    def _assign_geography(self):
-        return random.choices(['US', 'EU'], weights=[0.6, 0.4])[0]
-    
-    def _assign_industry(self):
-        industries = [
-            'ecommerce', 'saas_tech', 'financial_services', 'marketing_agency',
-            'healthcare', 'manufacturing', 'other'            
-        ]
-        weights = [0.25, 0.20, 0.15, 0.15, 0.10, 0.10, 0.05]
-        return random.choices(industries, weights=weights)[0]
-    
-    def _assign_acquisition_channel(self):
-        channels = [
-            'organic_search', 'paid_ads', 'referral',
-            'direct', 'partner', 'content_marketing'
-        ]
-        weights = [0.30, 0.25, 0.15, 0.15, 0.10, 0.05]
-        return random.choices(channels, weights=weights)[0]
-    
-    def _generate_signup_date(self):
-        max_signup_month = 6
-
-        month_weights = self._get_signup_seasonality()
-
-        signup_month = random.choices(
-            range(1, max_signup_month + 1),
-            weights=month_weights[:max_signup_month]
-        )[0]
-
-        start_date = datetime(2023, 1, 1)
-        signup_date = start_date + timedelta(days=(signup_month - 1) * 30 + random.randint(0, 29))
-
-        return signup_date.strftime('%Y-%m-%d')
-    
-    def _get_signup_seasonality(self):
-        base_weight = 1.0
-        weights = [base_weight] * 24
-        
-        for i in range(0, 24, 12):
-            if i < len(weights):
-                weights[i] = 1.3
-
-        for i in range(8, 24, 12):
-            if i < len(weights):
-                weights[i] = 1.2
+    def generate(self, num_customers=1000, chunk_size=DEFAULT_CHUNK_SIZE):
+        """All customers as one DataFrame, built chunk by chunk; see generate_chunks()."""
+        chunks = list(self.generate_chunks(num_customers, chunk_size))
+        if len(chunks) == 1:
+            return chunks[0]
+        return pd.concat(chunks, ignore_index=True)
+
+    def generate_chunks(self, num_customers, chunk_size=DEFAULT_CHUNK_SIZE, first_id=1):
+        """Yield customers in DataFrames of at most chunk_size rows, for populations too large to hold at once."""
+        for start in range(0, num_customers, chunk_size):
+            stop = min(start + chunk_size, num_customers)
+            yield self._generate_batch(np.arange(first_id + start, first_id + stop, dtype=np.int64))
+
+    def _generate_batch(self, customer_ids):
+        n = len(customer_ids)
+        return conform('customers', pd.DataFrame({
+            'id': customer_ids,
+            'company_name': pd.Categorical.from_codes(self._company_name_codes(customer_ids), COMPANY_NAMES),
+            'signup_date': self._signup_dates(customer_ids),
+            'plan_tier': categorical_from_codes('customers', 'plan_tier', np.zeros(n), ['Basic']),
+            'geography': self._categorical(customer_ids, 'geography'),
+            'industry': self._categorical(customer_ids, 'industry'),
+            'acquisition_channel': self._categorical(customer_ids, 'channel'),
+            'status': categorical_from_codes('customers', 'status', np.zeros(n), ['active']),
+            'archetype': self._categorical(customer_ids, 'archetype')
+        }))
+
+    def _choice_codes(self, customer_ids, draw):
+        return self.random_streams.choice_index_array(
+            'customer_profile', customer_ids, 0, PROFILE_DRAWS[draw], self.cumulative_weights[draw]
+        )
+
+    def _categorical(self, customer_ids, draw):
+        return categorical_from_codes(
+            'customers', CATEGORY_COLUMNS[draw], self._choice_codes(customer_ids, draw), self.choices[draw][0]
+        )
+
+    def _draws(self, customer_ids, draw):
+        return self.random_streams.random_array('customer_profile', customer_ids, 0, PROFILE_DRAWS[draw])
+
+    def _signup_dates(self, customer_ids):
+        signup_month = self._choice_codes(customer_ids, 'signup_month') + 1
+        signup_day = np.floor(self._draws(customer_ids, 'signup_day') * DAYS_PER_MONTH).astype(np.int64)
+        return to_dates((signup_month - 1) * DAYS_PER_MONTH + signup_day)
+
+    def _company_name_codes(self, customer_ids):
+        """Index into COMPANY_NAMES: 30% standalone names, the rest prefix + suffix pairs."""
+        standalone = self._draws(customer_ids, 'name_style') < STANDALONE_NAME_SHARE
+        prefix_draw = self._draws(customer_ids, 'prefix')
+        standalone_code = np.floor(prefix_draw * len(STANDALONE_NAMES)).astype(np.int64)
+        prefix = np.floor(prefix_draw * len(NAME_PREFIXES)).astype(np.int64)
+        suffix = np.floor(self._draws(customer_ids, 'suffix') * len(NAME_SUFFIXES)).astype(np.int64)
+        return np.where(standalone, standalone_code, len(STANDALONE_NAMES) + prefix * len(NAME_SUFFIXES) + suffix)
 
-        return weights
-    
-    def _generate_company_name(self):
-        prefixes = [
-            'Apex', 'Nova', 'Prime', 'Elite', 'Summit', 'Vertex', 'Zenith', 'Alpha',
-            'Beta', 'Delta', 'Gamma', 'Meta', 'Ultra', 'Super', 'Mega', 'Hyper',
-            'Smart', 'Quick', 'Fast', 'Rapid', 'Swift', 'Agile', 'Dynamic', 'Global',
-            'Digital', 'Cyber', 'Tech', 'Data', 'Cloud', 'Web', 'Mobile', 'Auto'            
-        ]
-
-        suffixes = [
-            'Solutions', 'Systems', 'Technologies', 'Dynamics', 'Innovations',
-            'Labs', 'Works', 'Studio', 'Group', 'Corp', 'Inc', 'LLC', 'Ltd',
-            'Enterprises', 'Ventures', 'Partners', 'Associates', 'Consulting',
-            'Services', 'Analytics', 'Intelligence', 'Insights', 'Data', 'Hub'           
-        ]
-
-        if random.random() < 0.3:
-            return random.choice(prefixes + ['Acme', 'Pioneer', 'Fusion', 'Nexus', 'Quantum'])
-        else:
-            return f"{random.choice(prefixes)} {random.choice(suffixes)}"
-        
     def get_archetype_distribution(self, customers_df):
         actual_dist = customers_df['archetype'].value_counts()
         total = len(customers_df)
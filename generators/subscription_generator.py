@@ -1,34 +1,181 @@
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent.parent))
+
+import numpy as np
 import pandas as pd
-from datetime import datetime, timedelta
+
+from core.day_offsets import DAYS_PER_MONTH, to_day_offsets, to_dates
+from core.random_streams import RandomStreams
+from core.schema import categorical_from_codes, conform
+
+LIFECYCLE_DRAWS = {'churn': 0, 'plan_change': 1}
+LEDGER_COLUMNS = ('id', 'customer', 'plan', 'start_day', 'end_day')
+
+
+class SubscriptionLedger:
+    """Columnar subscription rows plus a pointer from each customer to its current row.
+    
+    Customers are addressed by position, so opening or closing subscriptions
+    for a whole month's worth of customers is a handful of array writes.
+    """
+    
+    def __init__(self, customer_count):
+        self.count = 0
+        capacity = max(16, 2 * customer_count)
+        self.columns = {
+            name: np.full(capacity, -1 if name == 'end_day' else 0, dtype=np.int64) for name in LEDGER_COLUMNS
+        }
+        self.current = np.full(customer_count, -1, dtype=np.int64)
+    
+    def open(self, customers, plans, start_days, first_id):
+        count = len(customers)
+        self._reserve(self.count + count)
+        rows = np.arange(self.count, self.count + count)
+        self.columns['id'][rows] = np.arange(first_id, first_id + count)
+        self.columns['customer'][rows] = customers
+        self.columns['plan'][rows] = plans
+        self.columns['start_day'][rows] = start_days
+        self.current[customers] = rows
+        self.count += count
+    
+    def close(self, customers, day):
+        self.columns['end_day'][self.current[customers]] = day
+    
+    def current_values(self, name, customers):
+        return self.columns[name][self.current[customers]]
+    
+    def rows(self):
+        return {name: values[:self.count] for name, values in self.columns.items()}
+    
+    def _reserve(self, required):
+        capacity = len(self.columns['id'])
+        if required <= capacity:
+            return
+        new_capacity = max(required, 2 * capacity)
+        for name, values in self.columns.items():
+            grown = np.full(new_capacity, -1 if name == 'end_day' else 0, dtype=np.int64)
+            grown[:capacity] = values
+            self.columns[name] = grown
+
+
+class SubscriptionIndex:
+    """Subscriptions sorted by (customer_id, start, id) with per-customer offsets.
+    
+    lookup() answers "which subscription was active for customer X on day D"
+    for whole arrays of (customer, date) pairs: every row gets a composite
+    (customer rank, start day) key, so one searchsorted finds the latest
+    subscription each customer started on or before each date.
+    """
+    
+    def __init__(self, subscriptions_df):
+        self.subscriptions_df = subscriptions_df
+        customer = subscriptions_df['customer_id'].to_numpy(dtype=np.int64)
+        start = to_day_offsets(subscriptions_df['start_date'])
+        end = np.full(len(subscriptions_df), -1, dtype=np.int64)
+        ended = subscriptions_df['end_date'].notna().to_numpy()
+        end[ended] = to_day_offsets(subscriptions_df['end_date'][ended])
+        subscription_ids = subscriptions_df['id'].to_numpy(dtype=np.int64)
+        
+        self.rows = np.lexsort((subscription_ids, start, customer))
+        self.subscription_id = subscription_ids[self.rows]
+        self.start_day = start[self.rows]
+        self.end_day = end[self.rows]
+        self.plan_id = subscriptions_df['plan_id'].to_numpy()[self.rows]
+        plan_codes, self.plan_names = pd.factorize(subscriptions_df['plan_name'])
+        self.plan_code = plan_codes[self.rows]
+        
+        self.customers, first_rows, counts = np.unique(customer[self.rows], return_index=True, return_counts=True)
+        self.offsets = np.append(first_rows, len(self.rows))
+        self.first_day = int(start.min()) if len(start) else 0
+        self.day_span = int(start.max()) - self.first_day + 2 if len(start) else 2
+        rank = np.repeat(np.arange(len(self.customers), dtype=np.int64), counts)
+        self.keys = rank * self.day_span + (self.start_day - self.first_day)
+    
+    def _match(self, customer_ids, dates):
+        customer_ids = np.asarray(customer_ids, dtype=np.int64)
+        days = np.asarray(dates)
+        if days.dtype.kind not in 'iu':
+            days = to_day_offsets(days)
+        days = days.astype(np.int64)
+        if not len(self.customers):
+            return np.zeros(len(customer_ids), dtype=bool), np.zeros(len(customer_ids), dtype=np.int64)
+        
+        # Searching in customer order keeps both binary searches cache-friendly
+        order = np.argsort(customer_ids)
+        customer_ids, days = customer_ids[order], days[order]
+        rank = np.minimum(np.searchsorted(self.customers, customer_ids), len(self.customers) - 1)
+        # Days before the earliest start clip to -1, which lands on the previous customer's rows
+        relative_day = np.clip(days - self.first_day, -1, self.day_span - 2)
+        row = np.searchsorted(self.keys, rank * self.day_span + relative_day, side='right') - 1
+        in_range = (self.customers[rank] == customer_ids) & (row >= self.offsets[rank])
+        row = np.maximum(row, 0)
+        end = self.end_day[row]
+        
+        found = np.empty(len(order), dtype=bool)
+        found[order] = in_range & ((end < 0) | (end > days))
+        matched_row = np.empty(len(order), dtype=np.int64)
+        matched_row[order] = row
+        return found, matched_row
+    
+    def lookup(self, customer_ids, dates):
+        """Active subscription per (customer_id, date) pair; id and plan_id -1, plan_name NaN where there was none.
+        
+        dates may be ISO strings, datetimes or integer day offsets. plan_name
+        comes back as a categorical.
+        """
+        found, row = self._match(customer_ids, dates)
+        if not len(self.rows):
+            missing = np.full(len(found), -1, dtype=np.int64)
+            return pd.DataFrame({
+                'subscription_id': missing,
+                'plan_id': missing,
+                'plan_name': pd.Categorical.from_codes(missing, self.plan_names)
+            })
+        return pd.DataFrame({
+            'subscription_id': np.where(found, self.subscription_id[row], -1),
+            'plan_id': np.where(found, self.plan_id[row], -1),
+            'plan_name': pd.Categorical.from_codes(np.where(found, self.plan_code[row], -1), self.plan_names)
+        })
+    
+    def active_row(self, customer_id, date):
+        """Position in subscriptions_df of the subscription active for one customer on one date, or None."""
+        found, row = self._match([customer_id], [date])
+        return int(self.rows[row[0]]) if found[0] else None
+    
+    def history(self, customer_id):
+        """All of a customer's subscriptions in start order, as rows of subscriptions_df."""
+        position = np.searchsorted(self.customers, customer_id)
+        if position == len(self.customers) or self.customers[position] != customer_id:
+            return self.subscriptions_df.iloc[:0]
+        return self.subscriptions_df.iloc[self.rows[self.offsets[position]:self.offsets[position + 1]]]
+
 
 class SubscriptionGenerator:
     def __init__(self, config):
         self.plans = {plan['name']: plan for plan in config['PLANS']}
         self.plan_list = config['PLANS']
         self.simulation_months = config.get('SIMULATION_MONTHS', 24)
+        self.random_streams = RandomStreams(config.get('RANDOM_SEED'))
         
         self.subscription_id_counter = 1
+        self._subscription_index = None
     
     def generate_initial_subscriptions(self, customers_df):
 
-        subscriptions = []
-        
-        for _, customer in customers_df.iterrows():
-            subscription = {
-                'id': self.subscription_id_counter,
-                'customer_id': customer['id'],
-                'plan_id': self._get_plan_id('Basic'),
-                'plan_name': 'Basic',
-                'start_date': customer['signup_date'],
-                'end_date': None,  
-                'monthly_price': self._get_plan_price('Basic'),
-                'status': 'active',
-                'billing_cycle': 'monthly'
-            }
-            subscriptions.append(subscription)
-            self.subscription_id_counter += 1
-        
-        return pd.DataFrame(subscriptions)
+        n = len(customers_df)
+        first_id = self._take_ids(n)
+        return conform('subscriptions', pd.DataFrame({
+            'id': np.arange(first_id, first_id + n, dtype=np.int64),
+            'customer_id': customers_df['id'].to_numpy(),
+            'plan_id': np.full(n, self._get_plan_id('Basic')),
+            'plan_name': categorical_from_codes('subscriptions', 'plan_name', np.zeros(n), ['Basic']),
+            'start_date': customers_df['signup_date'].to_numpy(),
+            'end_date': to_dates(np.full(n, -1)),
+            'monthly_price': np.full(n, self._get_plan_price('Basic')),
+            'status': categorical_from_codes('subscriptions', 'status', np.zeros(n), ['active']),
+            'billing_cycle': categorical_from_codes('subscriptions', 'billing_cycle', np.zeros(n), ['monthly'])
+        }))
     
     def create_plan_change(self, customer_id, current_subscription, new_plan_name, change_date, change_type='upgrade'):
 
@@ -59,27 +206,24 @@ class SubscriptionGenerator:
         
         return cancelled_subscription
     
-    def get_active_subscription(self, subscriptions_df, customer_id, date):
- 
-        customer_subs = subscriptions_df[subscriptions_df['customer_id'] == customer_id]
-        
-        for _, sub in customer_subs.iterrows():
-            start_date = datetime.strptime(sub['start_date'], '%Y-%m-%d')
-            
-            if start_date.date() <= date.date():
-                if sub['end_date'] is None or pd.isna(sub['end_date']):
-                    return sub 
-                else:
-                    end_date = datetime.strptime(sub['end_date'], '%Y-%m-%d')
-                    if end_date.date() > date.date():
-                        return sub  
+    def subscription_index(self, subscriptions_df):
+        """SubscriptionIndex over subscriptions_df, reused while the same frame keeps being passed in.
         
-        return None
+        The index is a snapshot; build a new one with SubscriptionIndex() after
+        editing the frame in place.
+        """
+        if self._subscription_index is None or self._subscription_index.subscriptions_df is not subscriptions_df:
+            self._subscription_index = SubscriptionIndex(subscriptions_df)
+        return self._subscription_index
+    
+    def get_active_subscription(self, subscriptions_df, customer_id, date):
+        """One as-of lookup; use subscription_index(df).lookup() for arrays of (customer, date) pairs."""
+        row = self.subscription_index(subscriptions_df).active_row(customer_id, np.datetime64(date, 'D'))
+        return None if row is None else subscriptions_df.iloc[row]
     
     def get_subscription_history(self, subscriptions_df, customer_id):
 
-        customer_subs = subscriptions_df[subscriptions_df['customer_id'] == customer_id]
-        return customer_subs.sort_values('start_date')
+        return self.subscription_index(subscriptions_df).history(customer_id)
     
     def calculate_mrr_impact(self, old_plan_name, new_plan_name):
 
@@ -136,92 +280,94 @@ class SubscriptionGenerator:
         return stats
     
     def simulate_subscription_lifecycle(self, customers_df, behavior_engine, timeline_months):
+        """Churn and plan changes month by month for all customers at once; returns every subscription by id.
+
+        Churn risk depends only on a customer's (archetype, geography, industry)
+        segment and the month, so it is resolved once per segment per month.
+        Plan changes in a month get new subscription ids in customer order.
+        """
+        n = len(customers_df)
+        customer_ids = customers_df['id'].to_numpy(dtype=np.int64)
+        segments = pd.MultiIndex.from_arrays([
+            customers_df['archetype'], customers_df['geography'], customers_df['industry']
+        ])
+        segment_codes, segment_values = segments.factorize()
+        segment_customers = [
+            {'archetype': archetype, 'geography': geography, 'industry': industry}
+            for archetype, geography, industry in segment_values
+        ]
+        archetypes = customers_df['archetype'].to_numpy()
+        steady_grower = archetypes == 'steady_grower'
+        seasonal_business = archetypes == 'seasonal_business'
+
+        plan_names = [plan['name'] for plan in self.plan_list]
+        plan_codes = {name: code for code, name in enumerate(plan_names)}
+        upgrade_target = np.array([plan_codes.get(self.get_plan_upgrade_path(name), -1) for name in plan_names])
+        basic, pro = plan_codes['Basic'], plan_codes['Pro']
+
+        ledger = SubscriptionLedger(n)
+        ledger.open(np.arange(n), np.full(n, basic), to_day_offsets(customers_df['signup_date']), self._take_ids(n))
+        active = np.ones(n, dtype=bool)
 
-        all_subscriptions = []
-        current_subscriptions = self.generate_initial_subscriptions(customers_df)
-        all_subscriptions.extend(current_subscriptions.to_dict('records'))
-        
-        customers_dict = customers_df.set_index('id').to_dict('records')
-        active_customers = set(customers_df['id'].tolist())
-        
         for month in range(1, timeline_months + 1):
-            current_date = datetime(2023, 1, 1) + timedelta(days=month * 30)
-            
-            customers_to_remove = set()
-            
-            for customer_id in list(active_customers):
-                customer = customers_dict[customer_id - 1]  
-                
-                current_sub_df = pd.DataFrame(all_subscriptions)
-                current_sub = self.get_active_subscription(current_sub_df, customer_id, current_date)
-                
-                if current_sub is None:
-                    continue
-                
-                churn_risk = behavior_engine.calculate_churn_risk(
-                    customer, month, [], 0  
-                )
-                
-                if random.random() < churn_risk:
-                    cancelled_sub = self.cancel_subscription(current_sub, current_date.strftime('%Y-%m-%d'))
-                    
-                    for i, sub in enumerate(all_subscriptions):
-                        if sub['id'] == current_sub['id']:
-                            all_subscriptions[i] = cancelled_sub
-                            break
-                    
-                    customers_to_remove.add(customer_id)
-                    continue
-                
-                current_plan = current_sub['plan_name']
-                
-                if customer['archetype'] == 'steady_grower' and month % 6 == 0:  
-                    target_plan = self.get_plan_upgrade_path(current_plan)
-                    if target_plan and random.random() < 0.3:  
-                        ended_sub, new_sub = self.create_plan_change(
-                            customer_id, current_sub, target_plan, 
-                            current_date.strftime('%Y-%m-%d'), 'upgrade'
-                        )
-                        
-                        for i, sub in enumerate(all_subscriptions):
-                            if sub['id'] == current_sub['id']:
-                                all_subscriptions[i] = ended_sub
-                                break
-                        all_subscriptions.append(new_sub)
-                
-                elif customer['archetype'] == 'seasonal_business':
-                    quarter = ((month - 1) % 12) // 3 + 1
-                    
-                    if quarter == 3 and current_plan == 'Basic' and random.random() < 0.4:
-                        ended_sub, new_sub = self.create_plan_change(
-                            customer_id, current_sub, 'Pro',
-                            current_date.strftime('%Y-%m-%d'), 'upgrade'
-                        )
-                        for i, sub in enumerate(all_subscriptions):
-                            if sub['id'] == current_sub['id']:
-                                all_subscriptions[i] = ended_sub
-                                break
-                        all_subscriptions.append(new_sub)
-                    
-                    elif quarter == 2 and current_plan == 'Pro' and random.random() < 0.3:
-                        ended_sub, new_sub = self.create_plan_change(
-                            customer_id, current_sub, 'Basic',
-                            current_date.strftime('%Y-%m-%d'), 'downgrade'
-                        )
-                        for i, sub in enumerate(all_subscriptions):
-                            if sub['id'] == current_sub['id']:
-                                all_subscriptions[i] = ended_sub
-                                break
-                        all_subscriptions.append(new_sub)
-            
-            active_customers -= customers_to_remove
-        
-        return pd.DataFrame(all_subscriptions)
+            day = month * DAYS_PER_MONTH
+            current = np.flatnonzero(active)
+            current = current[ledger.current_values('start_day', current) <= day]
+
+            churn_risk = np.array([
+                behavior_engine.calculate_churn_risk(customer, month, [], 0) for customer in segment_customers
+            ])
+            churning = self._lifecycle_draws(customer_ids[current], month, 'churn') < churn_risk[segment_codes[current]]
+            churned = current[churning]
+            ledger.close(churned, day)
+            active[churned] = False
+
+            staying = current[~churning]
+            plan = ledger.current_values('plan', staying)
+            draws = self._lifecycle_draws(customer_ids[staying], month, 'plan_change')
+            new_plan = plan.copy()
+
+            if month % 6 == 0:
+                upgrade = steady_grower[staying] & (upgrade_target[plan] >= 0) & (draws < 0.3)
+                new_plan[upgrade] = upgrade_target[plan[upgrade]]
+
+            quarter = ((month - 1) % 12) // 3 + 1
+            if quarter == 3:
+                new_plan[seasonal_business[staying] & (plan == basic) & (draws < 0.4)] = pro
+            elif quarter == 2:
+                new_plan[seasonal_business[staying] & (plan == pro) & (draws < 0.3)] = basic
+
+            changed = np.flatnonzero(new_plan != plan)
+            ledger.close(staying[changed], day)
+            ledger.open(staying[changed], new_plan[changed], day, self._take_ids(len(changed)))
+
+        return self._ledger_frame(ledger.rows(), customer_ids, plan_names)
+
+    def _ledger_frame(self, rows, customer_ids, plan_names):
+        plan = rows['plan']
+        closed = rows['end_day'] >= 0
+        return conform('subscriptions', pd.DataFrame({
+            'id': rows['id'],
+            'customer_id': customer_ids[rows['customer']],
+            'plan_id': np.array([self._get_plan_id(name) for name in plan_names])[plan],
+            'plan_name': categorical_from_codes('subscriptions', 'plan_name', plan, plan_names),
+            'start_date': to_dates(rows['start_day']),
+            'end_date': to_dates(rows['end_day']),
+            'monthly_price': np.array([self._get_plan_price(name) for name in plan_names])[plan],
+            'status': categorical_from_codes('subscriptions', 'status', closed, ['active', 'cancelled']),
+            'billing_cycle': categorical_from_codes('subscriptions', 'billing_cycle', np.zeros(len(plan)), ['monthly'])
+        }))
+
+    def _take_ids(self, count):
+        first_id = self.subscription_id_counter
+        self.subscription_id_counter += count
+        return first_id
+
+    def _lifecycle_draws(self, customer_ids, month, draw):
+        return self.random_streams.random_array('lifecycle', customer_ids, month, LIFECYCLE_DRAWS[draw])
 
 
 if __name__ == "__main__":
-    import random
-    
     sample_config = {
         'PLANS': [
             {'id': 1, 'name': 'Basic', 'monthly_price': 99},
@@ -9,17 +9,28 @@ from config.business_rules import PLANS, SIMULATION_MONTHS, TOTAL_CUSTOMERS
 from config.constants import GEOGRAPHIES, INDUSTRIES, ACQUISITION_CHANNELS
 
 from core.behavior_engine import BehaviorEngine
+from core.checkpoints import load_checkpoint
+from core.random_streams import RandomStreams
 from core.timeline_simulator import TimelineSimulator
+from core.vectorized_simulator import VectorizedTimelineSimulator
+from core.parallel_simulator import ParallelTimelineSimulator
+from core.result_sinks import CsvSink, ParquetSink
 from generators.customer_generator import CustomerGenerator
 from generators.subscription_generator import SubscriptionGenerator
 
-def main():
-    
-    print("🚀 Starting Customer Analytics SaaS Simulation")
-    print("=" * 50)
-    
-    print("📋 Loading configuration...")
-    config = {
+SIMULATION_ENGINES = {
+    'scalar': TimelineSimulator,
+    'vectorized': VectorizedTimelineSimulator,
+    'parallel': ParallelTimelineSimulator
+}
+
+OUTPUT_SINKS = {
+    'csv': CsvSink,
+    'parquet': ParquetSink
+}
+
+def build_config(workers=None, seed=None, metrics=False):
+    return {
         'CUSTOMER_ARCHETYPES': CUSTOMER_ARCHETYPES,
         'GEOGRAPHIC_MODIFIERS': GEOGRAPHIC_MODIFIERS,
         'INDUSTRY_MODIFIERS': INDUSTRY_MODIFIERS,
@@ -28,21 +39,54 @@ def main():
         'TOTAL_CUSTOMERS': TOTAL_CUSTOMERS,
         'GEOGRAPHIES': GEOGRAPHIES,
         'INDUSTRIES': INDUSTRIES,
-        'ACQUISITION_CHANNELS': ACQUISITION_CHANNELS
+        'ACQUISITION_CHANNELS': ACQUISITION_CHANNELS,
+        'SIMULATION_WORKERS': workers,
+        'SIMULATION_METRICS': metrics,
+        'RANDOM_SEED': seed
     }
-    
-    print("🧠 Initializing behavior engine...")
-    behavior_engine = BehaviorEngine(
+
+def report_metrics(report, metrics_path):
+    """Print the headline numbers from a metrics report and save the full report as JSON."""
+    import json
+    
+    rate = report['customer_months_per_second']
+    print(f"\n⏱️  {report['customer_months']} customer-months in {report['total_seconds']:.2f}s"
+          + (f" ({rate:,.0f}/s)" if rate else ""))
+    if report['peak_memory_bytes']:
+        print(f"🧮 Peak traced memory: {report['peak_memory_bytes'] / 1e6:,.1f} MB")
+    for phase, timing in report['phases'].items():
+        print(f"  {phase}: {timing['seconds']:.3f}s over {timing['calls']} calls")
+    
+    with open(metrics_path, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"📄 Metrics written to {metrics_path}")
+
+def build_behavior_engine(seed):
+    return BehaviorEngine(
         CUSTOMER_ARCHETYPES,
-        {'PLANS': PLANS, 'SIMULATION_MONTHS': SIMULATION_MONTHS},
+        {'PLANS': PLANS, 'SIMULATION_MONTHS': SIMULATION_MONTHS, 'RANDOM_SEED': seed},
         GEOGRAPHIC_MODIFIERS,
         INDUSTRY_MODIFIERS
     )
+
+def main(engine='scalar', workers=None, seed=None, output_format='csv', metrics_path=None):
+    
+    print("🚀 Starting Customer Analytics SaaS Simulation")
+    print("=" * 50)
+    
+    seed = RandomStreams(seed).seed
+    print(f"🎲 Random seed: {seed}")
+    
+    print("📋 Loading configuration...")
+    config = build_config(workers, seed, metrics=bool(metrics_path))
+    
+    print("🧠 Initializing behavior engine...")
+    behavior_engine = build_behavior_engine(seed)
     
     print("📊 Initializing generators...")
     customer_generator = CustomerGenerator(config)
     subscription_generator = SubscriptionGenerator(config)
-    timeline_simulator = TimelineSimulator(behavior_engine, subscription_generator, config)
+    timeline_simulator = SIMULATION_ENGINES[engine](behavior_engine, subscription_generator, config)
     
     print(f"👥 Generating {TOTAL_CUSTOMERS} customers...")
     customers = customer_generator.generate(TOTAL_CUSTOMERS)
@@ -61,6 +105,9 @@ def main():
     
     results = timeline_simulator.simulate(customers)
     
+    if metrics_path:
+        report_metrics(results['metrics'], metrics_path)
+    
     print("\n✅ Simulation Complete! Results Summary:")
     print("=" * 50)
     
@@ -99,32 +146,113 @@ def main():
     print("\n📋 PLANS (static reference data):")
     print(plans_df)
     
-    save_to_csv = input("\n💾 Save results to CSV files? (y/n): ").lower().strip()
+    save_results = input(f"\n💾 Save results to {output_format.upper()} files? (y/n): ").lower().strip()
     
-    if save_to_csv == 'y':
+    if save_results == 'y':
         output_dir = 'simulation_output'
-        os.makedirs(output_dir, exist_ok=True)
         
-        plans_df.to_csv(f'{output_dir}/plans.csv', index=False)
-        results['customers'].to_csv(f'{output_dir}/customers.csv', index=False)
-        results['subscriptions'].to_csv(f'{output_dir}/subscriptions.csv', index=False)
-        results['usage_events'].to_csv(f'{output_dir}/usage_events.csv', index=False)
-        results['billing_transactions'].to_csv(f'{output_dir}/billing_transactions.csv', index=False)
+        sink = OUTPUT_SINKS[output_format](output_dir)
+        sink.write_tables({'plans': plans_df})
+        sink.write_batch({'month': SIMULATION_MONTHS, 'final': True, **results})
+        sink.close()
         
         print(f"✅ Files saved to {output_dir}/ directory")
-        print("  - plans.csv")
-        print("  - customers.csv")
-        print("  - subscriptions.csv") 
-        print("  - usage_events.csv")
-        print("  - billing_transactions.csv")
+        suffix = '.csv' if output_format == 'csv' else '/'
+        for table in ['plans', 'customers', 'subscriptions', 'usage_events', 'billing_transactions']:
+            print(f"  - {table}{suffix}")
+        if output_format == 'parquet':
+            print("  - manifest.json")
     
     print("\n🎉 Simulation complete! Your data is ready for dashboard analysis.")
     
     return results
 
-def quick_test():
+def stream_main(engine='scalar', seed=None, output_dir='simulation_output', output_format='csv', metrics_path=None,
+                checkpoint_path=None):
+    """Run the full simulation writing each month straight to disk instead of holding results in memory."""
+    
+    print("🚀 Starting Customer Analytics SaaS Simulation (streaming)")
+    print("=" * 50)
+    
+    seed = RandomStreams(seed).seed
+    print(f"🎲 Random seed: {seed}")
+    
+    config = build_config(seed=seed, metrics=bool(metrics_path))
+    config['CHECKPOINT_PATH'] = checkpoint_path
+    customer_generator = CustomerGenerator(config)
+    subscription_generator = SubscriptionGenerator(config)
+    timeline_simulator = SIMULATION_ENGINES[engine](build_behavior_engine(seed), subscription_generator, config)
+    
+    print(f"👥 Generating {TOTAL_CUSTOMERS} customers...")
+    customers = customer_generator.generate(TOTAL_CUSTOMERS)
+    
+    import pandas as pd
+    sink = OUTPUT_SINKS[output_format](output_dir)
+    sink.write_tables({'plans': pd.DataFrame(PLANS)})
+    
+    print(f"\n⏱️  Streaming {SIMULATION_MONTHS}-month timeline simulation to {output_dir}/...")
+    timeline_simulator.simulate_to_sink(customers, sink)
+    
+    if metrics_path:
+        report_metrics(timeline_simulator.metrics.report(type(timeline_simulator).__name__), metrics_path)
+    
+    print(f"✅ Files saved to {output_dir}/ directory")
+
+def load_main(engine='scalar', seed=None, database_url=None, metrics_path=None):
+    """Simulate straight into the warehouse, loading each month while the next one is simulated; no files are written."""
+    from etl.db_connection import get_db_connection
+    from etl.pipeline import run_pipeline
+    
+    print("🚀 Starting Customer Analytics SaaS Simulation (loading into the warehouse)")
+    print("=" * 50)
+    
+    seed = RandomStreams(seed).seed
+    print(f"🎲 Random seed: {seed}")
+    
+    config = build_config(seed=seed, metrics=bool(metrics_path))
+    customer_generator = CustomerGenerator(config)
+    subscription_generator = SubscriptionGenerator(config)
+    timeline_simulator = SIMULATION_ENGINES[engine](build_behavior_engine(seed), subscription_generator, config)
+    
+    print(f"👥 Generating {TOTAL_CUSTOMERS} customers...")
+    customers = customer_generator.generate(TOTAL_CUSTOMERS)
+    
+    run_pipeline(timeline_simulator, customers, get_db_connection(database_url))
+    
+    if metrics_path:
+        report_metrics(timeline_simulator.metrics.report(type(timeline_simulator).__name__), metrics_path)
+    
+    print("✅ Warehouse loaded")
+
+def resume_main(checkpoint_path, output_dir='simulation_output', output_format='csv', extend_months=0, metrics_path=None):
+    """Finish (or extend) a checkpointed --stream run, appending to its existing output."""
+    
+    checkpoint = load_checkpoint(checkpoint_path)
+    engine = {cls.__name__: name for name, cls in SIMULATION_ENGINES.items()}[checkpoint['engine']]
+    seed = checkpoint['seed']
+    print(f"🔁 Resuming {engine} run from month {checkpoint['month']} (seed {seed})")
+    
+    config = build_config(seed=seed, metrics=bool(metrics_path))
+    config['CHECKPOINT_PATH'] = checkpoint_path
+    timeline_simulator = SIMULATION_ENGINES[engine](build_behavior_engine(seed), SubscriptionGenerator(config), config)
+    
+    sink = OUTPUT_SINKS[output_format](output_dir)
+    if extend_months:
+        timeline_simulator.extend(extend_months, checkpoint, sink)
+    else:
+        timeline_simulator.resume(checkpoint, sink)
+    
+    if metrics_path:
+        report_metrics(timeline_simulator.metrics.report(type(timeline_simulator).__name__), metrics_path)
+    
+    print(f"✅ Files saved to {output_dir}/ directory ({timeline_simulator.simulation_months} months)")
+
+def quick_test(engine='scalar', workers=None, seed=None, metrics_path=None):
     print("🧪 Running Quick Test Simulation (100 customers, 6 months)")
     
+    seed = RandomStreams(seed).seed
+    print(f"🎲 Random seed: {seed}")
+    
     test_config = {
         'CUSTOMER_ARCHETYPES': {
             'steady_grower': {'distribution_weight': 0.40, 'monthly_growth_rate': 0.15, 'upgrade_threshold': 0.8, 'base_churn_rate': 0.01},
@@ -149,24 +277,30 @@ def quick_test():
         'TOTAL_CUSTOMERS': 100,
         'GEOGRAPHIES': ['US', 'EU'],
         'INDUSTRIES': ['ecommerce', 'saas_tech', 'other'],
-        'ACQUISITION_CHANNELS': ['organic_search', 'paid_ads', 'referral']
+        'ACQUISITION_CHANNELS': ['organic_search', 'paid_ads', 'referral'],
+        'SIMULATION_WORKERS': workers,
+        'SIMULATION_METRICS': bool(metrics_path),
+        'RANDOM_SEED': seed
     }
     
     behavior_engine = BehaviorEngine(
         test_config['CUSTOMER_ARCHETYPES'],
-        {'PLANS': test_config['PLANS'], 'SIMULATION_MONTHS': test_config['SIMULATION_MONTHS']},
+        {'PLANS': test_config['PLANS'], 'SIMULATION_MONTHS': test_config['SIMULATION_MONTHS'], 'RANDOM_SEED': seed},
         test_config['GEOGRAPHIC_MODIFIERS'],
         test_config['INDUSTRY_MODIFIERS']
     )
     
     customer_generator = CustomerGenerator(test_config)
     subscription_generator = SubscriptionGenerator(test_config)
-    timeline_simulator = TimelineSimulator(behavior_engine, subscription_generator, test_config)
+    timeline_simulator = SIMULATION_ENGINES[engine](behavior_engine, subscription_generator, test_config)
     
     customers = customer_generator.generate(100)
     results = timeline_simulator.simulate(customers)
     summary = timeline_simulator.get_simulation_summary(results)
     
+    if metrics_path:
+        report_metrics(results['metrics'], metrics_path)
+    
     print(f"✅ Test Results: {summary['total_customers']} customers, {summary['churned_customers']} churned")
     print(f"📊 Generated {len(results['usage_events'])} usage events, {len(results['billing_transactions'])} billing transactions")
     
@@ -177,10 +311,55 @@ if __name__ == "__main__":
     
     parser = argparse.ArgumentParser(description='Run Customer Analytics SaaS Simulation')
     parser.add_argument('--test', action='store_true', help='Run quick test with 100 customers')
+    parser.add_argument('--engine', choices=sorted(SIMULATION_ENGINES), default='scalar',
+                        help='Simulation engine: per-customer scalar loop, columnar NumPy engine, '
+                             'or the NumPy engine sharded across processes')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='Worker processes for the parallel engine (default: all cores)')
+    parser.add_argument('--metrics', nargs='?', const='simulation_metrics.json', default=None, metavar='PATH',
+                        help='Time simulation phases, trace peak memory per month and save a JSON report '
+                             '(default path: simulation_metrics.json)')
+    parser.add_argument('--seed', type=int, default=None,
+                        help='Random seed; the same seed reproduces a run on every engine')
+    parser.add_argument('--stream', action='store_true',
+                        help='Write results month by month to CSV instead of holding them in memory')
+    parser.add_argument('--load', action='store_true',
+                        help='Load each simulated month straight into the warehouse database, with no files in between')
+    parser.add_argument('--database-url', default=None, metavar='URL',
+                        help='With --load, SQLAlchemy URL of the warehouse (default: the DB_* settings in .env)')
+    parser.add_argument('--output-dir', default='simulation_output',
+                        help='Directory for --stream output (default: simulation_output)')
+    parser.add_argument('--format', choices=sorted(OUTPUT_SINKS), default='csv', dest='output_format',
+                        help='Output files: CSV, or typed Parquet partitioned by month (needs pyarrow)')
+    parser.add_argument('--checkpoint', default=None, metavar='PATH',
+                        help='With --stream, save a checkpoint after every month so the run can be resumed')
+    parser.add_argument('--resume', default=None, metavar='PATH',
+                        help='Continue a checkpointed --stream run into --output-dir')
+    parser.add_argument('--extend', type=int, default=0, metavar='MONTHS',
+                        help='With --resume, add MONTHS to the run\'s horizon, simulating only the new months')
     
     args = parser.parse_args()
     
-    if args.test:
-        quick_test()
+    if (args.checkpoint or args.resume) and args.engine == 'parallel':
+        parser.error('--checkpoint, --resume and --extend support the scalar and vectorized engines')
+    if (args.stream or args.load) and args.engine == 'parallel':
+        parser.error('--stream and --load support the scalar and vectorized engines')
+    if args.stream and args.load:
+        parser.error('--load streams into the database; drop --stream')
+    if args.database_url and not args.load:
+        parser.error('--database-url needs --load')
+    if args.checkpoint and not args.stream:
+        parser.error('--checkpoint needs --stream')
+    if args.extend and not args.resume:
+        parser.error('--extend needs --resume')
+    
+    if args.resume:
+        resume_main(args.resume, args.output_dir, args.output_format, args.extend, args.metrics)
+    elif args.test:
+        quick_test(args.engine, args.workers, args.seed, args.metrics)
+    elif args.load:
+        load_main(args.engine, args.seed, args.database_url, args.metrics)
+    elif args.stream:
+        stream_main(args.engine, args.seed, args.output_dir, args.output_format, args.metrics, args.checkpoint)
     else:
-        main()
\ No newline at end of file
+        main(args.engine, args.workers, args.seed, args.output_format, args.metrics)
\ No newline at end of file